@@ -0,0 +1,74 @@
+"""Expiry of undecided requests, archival of finished bookings, purge of expired holds.
+
+Both work in bounded batches so they can run next to live traffic: each
+batch is one short statement that skips rows locked by a concurrent
+transition instead of waiting for them."""
+from django.db import connection, transaction
+
+from .caching import listing_cache
+from .models import Booking, BookingArchive, BookingHold
+
+
+def expire_requests(today, batch_size):
+    """Mark up to batch_size REQUESTED bookings that should have started before today EXPIRED.
+
+    Returns:
+        number of bookings expired"""
+    table = connection.ops.quote_name(Booking._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            UPDATE {table} SET status = %s
+            WHERE id IN (
+                SELECT id FROM {table} WHERE status = %s AND date_from < %s
+                LIMIT %s FOR UPDATE SKIP LOCKED
+            )
+        """, [Booking.EXPIRED, Booking.REQUESTED, today, batch_size])
+        return cursor.rowcount
+
+
+def archive_bookings(cutoff, batch_size):
+    """Move up to batch_size decided bookings that ended before cutoff to BookingArchive.
+
+    One statement: the DELETE's RETURNING rows are the INSERT's input, so a
+    booking is never in both tables or in neither. The listing cache is
+    dropped after commit when approved stays left Booking.
+
+    Returns:
+        number of bookings moved"""
+    table = connection.ops.quote_name(Booking._meta.db_table)
+    archive = connection.ops.quote_name(BookingArchive._meta.db_table)
+    columns = ", ".join(connection.ops.quote_name(field.column) for field in BookingArchive._meta.concrete_fields
+                        if field.name != "archived_at")
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            WITH moved AS (
+                DELETE FROM {table} WHERE id IN (
+                    SELECT id FROM {table} WHERE date_to < %s AND status <> %s
+                    LIMIT %s FOR UPDATE SKIP LOCKED
+                )
+                RETURNING {columns}
+            )
+            INSERT INTO {archive} ({columns}, archived_at)
+            SELECT {columns}, now() FROM moved
+            RETURNING status
+        """, [cutoff, Booking.REQUESTED, batch_size])
+        statuses = [row[0] for row in cursor.fetchall()]
+    if Booking.APPROVED in statuses:
+        transaction.on_commit(listing_cache.invalidate)
+    return len(statuses)
+
+
+def purge_holds(now, batch_size):
+    """Delete up to batch_size BookingHolds that expired before now.
+
+    Returns:
+        number of holds deleted"""
+    table = connection.ops.quote_name(BookingHold._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            DELETE FROM {table} WHERE id IN (
+                SELECT id FROM {table} WHERE expires_at <= %s
+                LIMIT %s FOR UPDATE SKIP LOCKED
+            )
+        """, [now, batch_size])
+        return cursor.rowcount
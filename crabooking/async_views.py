@@ -0,0 +1,101 @@
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.response import Response
+
+
+class AsyncReadMixin:
+    """Serve GET/HEAD from an async handler, everything else through DRF's sync dispatch.
+
+    DRF views are sync-only, so under ASGI every request costs a thread hop.
+    Views using this mixin implement `aget`; safe reads then run on the event
+    loop with the async ORM (user lookup via the authenticators' `apreload`,
+    rows via the paginator's `apaginate_queryset`) and are rendered in place.
+    Writes and browsable API requests keep going through the regular sync view."""
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        sync_view = sync_to_async(super().as_view(**initkwargs))
+
+        async def view(request, *args, **kwargs):
+            if request.method in ('GET', 'HEAD') and not cls._wants_browsable_api(request):
+                self = cls(**initkwargs)
+                self.setup(request, *args, **kwargs)
+                return await self.adispatch(request, *args, **kwargs)
+            return await sync_view(request, *args, **kwargs)
+
+        view.cls = cls
+        view.initkwargs = initkwargs
+        return csrf_exempt(view)
+
+    @staticmethod
+    def _wants_browsable_api(request):
+        # the browsable API renderer queries the DB while rendering forms
+        return request.GET.get('format') == 'api' or 'text/html' in request.headers.get('Accept', '')
+
+    async def adispatch(self, request, *args, **kwargs):
+        """ async counterpart of `APIView.dispatch` """
+        self.args = args
+        self.kwargs = kwargs
+        for authenticator in self.get_authenticators():
+            if hasattr(authenticator, 'apreload'):
+                await authenticator.apreload(request)
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            self.initial(request, *args, **kwargs)
+            response = await self.aget(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self._render(self.response)
+
+    @staticmethod
+    def _render(response):
+        """Render on the event loop and return a plain HttpResponse.
+
+        Django renders template-like responses through `sync_to_async` in async
+        mode; handing back an already rendered HttpResponse avoids that hop."""
+        if not hasattr(response, 'render'):
+            # e.g. 304 Not Modified
+            return response
+        response.render()
+        rendered = HttpResponse(response.content, status=response.status_code)
+        for header, value in response.items():
+            rendered[header] = value
+        rendered.cookies = response.cookies
+        return rendered
+
+    def get_fast_serializer(self):
+        """ `fast_serializer_class` instance (see crabooking.fast_serializers), if the view opts in """
+        fast_serializer_class = getattr(self, 'fast_serializer_class', None)
+        if fast_serializer_class is None:
+            return None
+        return fast_serializer_class(context=self.get_serializer_context())
+
+    async def alist(self, request, *args, **kwargs):
+        """ async `ListModelMixin.list` """
+        queryset = self.filter_queryset(self.get_queryset())
+        fast = self.get_fast_serializer()
+        if fast is not None:
+            extra = []
+            if hasattr(self.paginator, 'get_ordering_columns'):
+                extra = self.paginator.get_ordering_columns(request, queryset, self)
+            queryset = fast.project(queryset, extra)
+
+        if self.paginator is not None:
+            page = await self.paginator.apaginate_queryset(queryset, request, view=self)
+            return self.get_paginated_response(self._list_data(page, fast))
+
+        return Response(self._list_data([obj async for obj in queryset], fast))
+
+    def _list_data(self, objects, fast):
+        if fast is not None:
+            return fast.to_representation(objects)
+        return self.get_serializer(objects, many=True).data
+
+    async def aget(self, request, *args, **kwargs):
+        return await self.alist(request, *args, **kwargs)
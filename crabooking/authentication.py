@@ -0,0 +1,72 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+class CookieJWTAuthentication(JWTAuthentication):
+    """DRF authentication that reuses the token verified by JWTAuthenticationMiddleware.
+
+    The middleware already decoded the access token cookie (and, on refresh,
+    loaded the user), so there is no reason to decode the Authorization header
+    again. Requests that did not go through the middleware fall back to the
+    regular simplejwt header flow."""
+
+    def authenticate(self, request):
+        django_request = request._request
+        error = getattr(django_request, '_jwt_auth_error', None)
+        if error is not None:
+            raise error
+
+        validated_token = getattr(django_request, '_jwt_token', None)
+        if validated_token is None:
+            return super().authenticate(request)
+
+        user = getattr(django_request, '_jwt_user', None)
+        if user is None:
+            user = self.get_user(validated_token)
+            django_request._jwt_user = user
+        elif api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user, validated_token
+
+    async def apreload(self, django_request):
+        """Resolve the token user with the async ORM ahead of `authenticate`.
+
+        Async views call this before DRF's (sync) authentication step, which then
+        finds `_jwt_user` on the request instead of querying from the event loop.
+        Failures are stored and re-raised by `authenticate`."""
+        if getattr(django_request, '_jwt_user', None) is not None:
+            return
+        try:
+            validated_token = getattr(django_request, '_jwt_token', None)
+            if validated_token is None:
+                header = self.get_header(django_request)
+                raw_token = self.get_raw_token(header) if header is not None else None
+                if raw_token is None:
+                    return
+                validated_token = self.get_validated_token(raw_token)
+                django_request._jwt_token = validated_token
+            django_request._jwt_user = await self.aget_user(validated_token)
+        except AuthenticationFailed as e:
+            django_request._jwt_auth_error = e
+
+    async def aget_user(self, validated_token):
+        """ async ORM version of `JWTAuthentication.get_user` """
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        try:
+            user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
@@ -0,0 +1,87 @@
+"""Per-listing availability calendar, one bitmap per month.
+
+Bit d-1 of a month's bitmap is set when day d is taken by an approved
+booking. Bitmaps are cached under a per-listing version, so a status change
+drops every month of the listing at once and a bitmap computed before the
+change can never be stored under the current version."""
+import calendar
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .caching import aget_version, bump_version, listing_cache
+from .models import Booking, BookingArchive
+
+
+def _namespace(listing_id):
+    return f"calendar:{listing_id}"
+
+
+def month_bounds(year, month):
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def _stays(listing_id, first, last):
+    """(date_from, date_to) of the approved stays of a listing within [first, last], one range query.
+
+    Past months also read BookingArchive, where `expire_bookings` moves
+    finished stays, so archiving never frees days in the calendar."""
+    stays = Booking.approved_overlapping(first, last).filter(listing_id=listing_id).values_list("date_from", "date_to")
+    if first < timezone.localdate():
+        stays = stays.union(BookingArchive.objects.filter(
+            listing_id=listing_id, status=Booking.APPROVED, date_from__lte=last, date_to__gte=first,
+        ).values_list("date_from", "date_to"), all=True)
+    return stays
+
+
+def _mark(bitmap, first, last, date_from, date_to):
+    start, end = max(date_from, first).day, min(date_to, last).day
+    return bitmap | ((1 << (end - start + 1)) - 1) << (start - 1)
+
+
+def compute_bitmap(listing_id, year, month):
+    """Bitmap of the approved days of a month, uncached (sync callers such as the browsable API)."""
+    first, last = month_bounds(year, month)
+    bitmap = 0
+    for date_from, date_to in _stays(listing_id, first, last):
+        bitmap = _mark(bitmap, first, last, date_from, date_to)
+    return bitmap
+
+
+async def acompute_bitmap(listing_id, year, month):
+    """ async `compute_bitmap` """
+    first, last = month_bounds(year, month)
+    bitmap = 0
+    async for date_from, date_to in _stays(listing_id, first, last):
+        bitmap = _mark(bitmap, first, last, date_from, date_to)
+    return bitmap
+
+
+async def aget_bitmap(listing_id, year, month):
+    namespace = _namespace(listing_id)
+    key = f"{namespace}:{await aget_version(namespace)}:{year:04d}-{month:02d}"
+    bitmap = await cache.aget(key)
+    if bitmap is None:
+        bitmap = await acompute_bitmap(listing_id, year, month)
+        await cache.aset(key, bitmap, timeout=settings.CALENDAR_CACHE_TIMEOUT)
+    return bitmap
+
+
+def invalidate_calendar(listing_id):
+    """Call when a booking of the listing enters or leaves APPROVED.
+
+    Drops the listing's calendar and the /listings/ cache (its available_from/to
+    filters and facets) once the current transaction commits."""
+    transaction.on_commit(lambda: bump_version(_namespace(listing_id)))
+    transaction.on_commit(listing_cache.invalidate)
+
+
+def month_days(bitmap, year, month):
+    """{"booked": [day, ...], "free": [day, ...]} from a month bitmap."""
+    days = calendar.monthrange(year, month)[1]
+    booked = [day for day in range(1, days + 1) if bitmap >> (day - 1) & 1]
+    free = [day for day in range(1, days + 1) if not bitmap >> (day - 1) & 1]
+    return {"booked": booked, "free": free}
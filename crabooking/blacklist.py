@@ -0,0 +1,131 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """Fixed size bloom filter over strings (double hashing on one blake2b digest)."""
+
+    def __init__(self, capacity, error_rate):
+        capacity = max(int(capacity), 1)
+        self.size = max(int(-capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self.hashes = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class JTIBlacklist:
+    """Per-worker membership structure for blacklisted refresh token JTIs.
+
+    All known JTIs live in a bloom filter; the most recent ones are also kept in
+    an exact set, since freshly rotated tokens are the ones replayed by racing
+    tabs. A bloom miss means "not blacklisted" without touching the DB, a bloom
+    hit outside the recent set is confirmed with one exact query.
+
+    The filter is refreshed incrementally (`id > last seen id - overlap`, so
+    rows committed out of id order are not missed) at most every
+    `JWT_BLACKLIST_SYNC_INTERVAL` seconds and rebuilt from unexpired rows every
+    `JWT_BLACKLIST_REBUILD_INTERVAL` seconds or when it runs over capacity, so
+    a token blacklisted by another worker is seen with at most one interval lag."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._recent = set()
+        self._count = 0
+        self._capacity = 0
+        self._last_id = 0
+        self._synced_at = 0.0
+        self._built_at = 0.0
+
+    def __contains__(self, jti):
+        self._maybe_sync()
+        if jti in self._recent:
+            return True
+        if jti not in self._bloom:
+            return False
+        # bloom hit: blacklisted or a false positive, ask the DB
+        return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+    def add(self, jti):
+        """ record a JTI blacklisted by this worker without waiting for the next sync """
+        self._maybe_sync()
+        with self._lock:
+            self._remember(jti)
+
+    def _remember(self, jti):
+        self._bloom.add(jti)
+        self._recent.add(jti)
+        self._count += 1
+        if len(self._recent) > settings.JWT_BLACKLIST_RECENT_SIZE:
+            # older entries stay in the bloom filter
+            self._recent.clear()
+
+    def _maybe_sync(self):
+        now = time.monotonic()
+        if self._bloom is not None and now - self._synced_at < settings.JWT_BLACKLIST_SYNC_INTERVAL:
+            return
+        with self._lock:
+            if self._bloom is None or self._count > self._capacity \
+                    or now - self._built_at > settings.JWT_BLACKLIST_REBUILD_INTERVAL:
+                self._rebuild(now)
+            else:
+                self._sync()
+            self._synced_at = now
+
+    def _rebuild(self, now):
+        last_id = BlacklistedToken.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        qs = (BlacklistedToken.objects
+              .filter(id__lte=last_id, token__expires_at__gt=timezone.now())
+              .order_by('id')
+              .values_list('id', 'token__jti'))
+        rows = list(qs.iterator(chunk_size=5000))
+        self._capacity = max(settings.JWT_BLACKLIST_BLOOM_CAPACITY, len(rows) * 2)
+        self._bloom = BloomFilter(self._capacity, settings.JWT_BLACKLIST_BLOOM_ERROR_RATE)
+        self._recent = set()
+        self._count = 0
+        for _, jti in rows:
+            self._bloom.add(jti)
+            self._count += 1
+        # the tail of the list is the newest, keep it exact
+        for _, jti in rows[-settings.JWT_BLACKLIST_RECENT_SIZE:]:
+            self._recent.add(jti)
+        self._last_id = last_id
+        self._built_at = now
+        logger.debug(f"JTI blacklist filter rebuilt with {self._count} entries")
+
+    def _sync(self):
+        rows = (BlacklistedToken.objects
+                .filter(id__gt=self._last_id - settings.JWT_BLACKLIST_SYNC_OVERLAP)
+                .order_by('id')
+                .values_list('id', 'token__jti'))
+        last_id = self._last_id
+        for row_id, jti in rows.iterator(chunk_size=5000):
+            # rows of the overlap window are mostly known already
+            if row_id > self._last_id or jti not in self._bloom:
+                self._remember(jti)
+            last_id = max(last_id, row_id)
+        self._last_id = last_id
+
+
+jti_blacklist = JTIBlacklist()
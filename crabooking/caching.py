@@ -0,0 +1,130 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+
+
+async def aget_version(namespace, alias=DEFAULT_CACHE_ALIAS):
+    """Current cache version of a namespace; part of every key built for it.
+
+    The version lives in the same cache alias as the namespace's entries."""
+    version = await caches[alias].aget(f"{namespace}:version")
+    if version is None:
+        version = time.time_ns()
+        await caches[alias].aset(f"{namespace}:version", version, timeout=None)
+    return version
+
+
+def bump_version(namespace, alias=DEFAULT_CACHE_ALIAS):
+    """Invalidate every entry of a namespace at once by moving to a new version.
+
+    Time based rather than `incr`, so an evicted counter can never come back
+    to a version that still has entries cached."""
+    version = time.time_ns()
+    caches[alias].set(f"{namespace}:version", version, timeout=None)
+    return version
+
+
+class LocalLRU:
+    """Small thread-safe per-process LRU with a per-entry TTL."""
+
+    def __init__(self, max_entries, timeout):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.timeout, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+
+class TieredCache:
+    """Versioned two-tier cache: per-process LRU in front of a Django cache alias.
+
+    Keys embed the namespace version, so `invalidate()` drops every entry of
+    the namespace at once. Each worker re-reads the version from the shared
+    store at most every `version_ttl` seconds; a bump made by another worker is
+    therefore seen within that window, a local bump immediately."""
+
+    def __init__(self, namespace, alias, timeout, local_size, version_ttl):
+        self.namespace = namespace
+        self.alias = alias
+        self.timeout = timeout
+        self.version_ttl = version_ttl
+        self.local = LocalLRU(local_size, timeout)
+        self._version = None
+        self._version_at = 0.0
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    async def aversion(self):
+        now = time.monotonic()
+        if self._version is None or now - self._version_at > self.version_ttl:
+            self._version = await aget_version(self.namespace, self.alias)
+            self._version_at = now
+        return self._version
+
+    async def akey(self, *parts):
+        return ":".join([self.namespace, str(await self.aversion()), *parts])
+
+    async def achanged_at(self):
+        """When the namespace was last invalidated, i.e. an upper bound of its
+        last change; usable as Last-Modified of anything cached in it."""
+        return datetime.fromtimestamp(await self.aversion() / 1e9, tz=timezone.utc)
+
+    async def aget(self, key):
+        value = self.local.get(key)
+        if value is None:
+            value = await self.shared.aget(key)
+            if value is not None:
+                self.local.set(key, value)
+        return value
+
+    async def aset(self, key, value):
+        self.local.set(key, value)
+        await self.shared.aset(key, value, timeout=self.timeout)
+
+    def invalidate(self):
+        """Bump the namespace version; inside a transaction, call via `transaction.on_commit`."""
+        self._version = bump_version(self.namespace, self.alias)
+        self._version_at = time.monotonic()
+
+
+def request_cache_key(request):
+    """Host, path and the query string with params in a stable order.
+
+    Empty values are kept: views may treat `?param=` differently from a
+    missing param (e.g. `is_active` on /listings/)."""
+    params = sorted((k, v) for k, values in request.GET.lists() for v in values)
+    return f"{request.get_host()}{request.path}?{urlencode(params)}"
+
+
+listing_cache = TieredCache(
+    "listings",
+    alias=settings.LISTING_CACHE_ALIAS,
+    timeout=settings.LISTING_CACHE_TIMEOUT,
+    local_size=settings.LISTING_CACHE_LOCAL_SIZE,
+    version_ttl=settings.LISTING_CACHE_VERSION_TTL,
+)
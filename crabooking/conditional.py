@@ -0,0 +1,47 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def make_etag(*parts):
+    """Strong ETag over the given parts (their repr)."""
+    return '"%s"' % hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+
+async def acollection_validators(queryset, field, *parts):
+    """ETag and Last-Modified for a collection, from `max(field)` and the row count.
+
+    One aggregate over the (filtered) queryset, nothing is fetched or
+    serialized. `parts` tell apart representations of the same rows, e.g. the
+    query string with cursor and ordering."""
+    stats = await queryset.order_by().aaggregate(last_modified=Max(field), count=Count("pk"))
+    return make_etag(*parts, stats["last_modified"], stats["count"]), stats["last_modified"]
+
+
+def page_etag(data, *parts):
+    """ETag for a serialized page, from the page itself.
+
+    For responses that are built anyway (e.g. on a cache miss), so no
+    aggregate query is needed. The rows on a page cannot give a safe
+    Last-Modified: rows that left it (deleted, deactivated, re-sorted) do
+    not show up in their timestamps."""
+    return make_etag(*parts, data)
+
+
+def not_modified(request, etag, last_modified):
+    """A 304 (or 412) response when the request's preconditions say so, else None."""
+    request = getattr(request, "_request", request)
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified):
+    response["ETag"] = etag
+    if last_modified:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    return response
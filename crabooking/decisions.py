@@ -0,0 +1,106 @@
+"""Bulk approve/reject of booking requests by a landlord.
+
+The listings involved are locked once, their approved stays are read in
+one query, and all approvals are checked against them and each other with a
+sorted sweep per listing. Every status change then goes out as one UPDATE
+per target status, all in the same transaction."""
+from collections import defaultdict
+
+from django.db import transaction
+
+from .availability import invalidate_calendar
+from .models import Booking, Listing
+from .transitions import OVERLAP_MESSAGE
+
+def sweep(approved, candidates):
+    """Ids of the candidates that overlap neither an approved stay nor an accepted candidate.
+
+    `approved` holds (date_from, date_to) and `candidates` (date_from, date_to,
+    id, position in request) inclusive intervals of one listing. Candidates
+    are taken by start date, the earlier stay wins a conflict within the
+    batch (ties: the earlier in the request)."""
+    approved = sorted(approved)
+    candidates = sorted(candidates, key=lambda item: (item[0], item[3]))
+    accepted = []
+    busy_until = None  # last day taken by stays starting before the current candidate
+    index = 0
+    for date_from, date_to, booking_id, _ in candidates:
+        while index < len(approved) and approved[index][0] < date_from:
+            if busy_until is None or approved[index][1] > busy_until:
+                busy_until = approved[index][1]
+            index += 1
+        if busy_until is not None and busy_until >= date_from:
+            continue
+        if index < len(approved) and approved[index][0] <= date_to:
+            continue
+        accepted.append(booking_id)
+        busy_until = date_to
+    return accepted
+
+
+def bulk_decide(user, decisions):
+    """Apply [{"id": n, "decision": "approve" | "reject"}, ...] for the listings' owner.
+
+    Decisions are `Booking.TRANSITIONS` actions and follow their rules.
+    Items that cannot be applied are reported and leave the others
+    unaffected.
+
+    Returns:
+        [{"id": n, "decision": ..., "status": new status} or
+         {"id": n, "decision": ..., "error": reason}, ...] in request order"""
+    ids = [item["id"] for item in decisions]
+    results = [{"id": item["id"], "decision": item["decision"]} for item in decisions]
+
+    with transaction.atomic():
+        # serializes bulk decisions on the same listings; a racing single approval
+        # is still caught by the booking_approved_no_overlap constraint
+        list(Listing.objects.select_for_update().filter(
+            pk__in=Booking.objects.filter(pk__in=ids).values("listing_id"), owner=user,
+        ).order_by("pk").values_list("pk", flat=True))
+        bookings = {row["id"]: row for row in Booking.objects.select_for_update().filter(
+            pk__in=ids).values("id", "listing_id", "landlord_id", "status", "date_from", "date_to")}
+
+        seen = set()
+        candidates = defaultdict(list)
+        for position, (item, result) in enumerate(zip(decisions, results)):
+            booking = bookings.get(item["id"])
+            if booking is None:
+                result["error"] = "Not found"
+            elif booking["landlord_id"] != user.id:
+                result["error"] = "Not allowed"
+            elif item["id"] in seen:
+                result["error"] = "Duplicate booking in request"
+            elif booking["status"] not in Booking.TRANSITIONS[item["decision"]]["from"]:
+                result["error"] = f"Cannot {item['decision']} now"
+            elif item["decision"] == "approve":
+                candidates[booking["listing_id"]].append(
+                    (booking["date_from"], booking["date_to"], booking["id"], position))
+            seen.add(item["id"])
+
+        accepted = set()
+        if candidates:
+            dates = [stay for stays in candidates.values() for stay in stays]
+            approved = defaultdict(list)
+            for listing_id, date_from, date_to in Booking.objects.filter(
+                listing_id__in=candidates, status=Booking.APPROVED,
+                date_to__gte=min(stay[0] for stay in dates), date_from__lte=max(stay[1] for stay in dates),
+            ).values_list("listing_id", "date_from", "date_to"):
+                approved[listing_id].append((date_from, date_to))
+            for listing_id, stays in candidates.items():
+                accepted.update(sweep(approved[listing_id], stays))
+
+        changes = defaultdict(list)
+        for item, result in zip(decisions, results):
+            if "error" in result:
+                continue
+            if item["decision"] == "approve" and item["id"] not in accepted:
+                result["error"] = OVERLAP_MESSAGE
+                continue
+            result["status"] = Booking.TRANSITIONS[item["decision"]]["to"]
+            changes[result["status"]].append(item["id"])
+        for new_status, pks in changes.items():
+            Booking.objects.filter(pk__in=pks).update(status=new_status)
+
+    for listing_id in {bookings[pk]["listing_id"] for pk in changes.get(Booking.APPROVED, [])}:
+        invalidate_calendar(listing_id)
+    return results
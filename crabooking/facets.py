@@ -0,0 +1,71 @@
+"""Facet counts for the listing search: per city, property type, rooms and price bucket.
+
+All facets and the total come from one grouped statement over the filtered
+listings, so a facet sidebar costs one query however many facets it shows."""
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, IntegerField, Value, When
+from django.db.models.functions import Lower
+
+# the columns grouped on, in the order of GROUPING SETS below
+FACETS = ["city", "property_type", "rooms", "price"]
+
+
+def price_bucket_expression(bounds):
+    """Index of the price bucket: 0 below bounds[0], len(bounds) from bounds[-1] up."""
+    return Case(
+        *[When(price_per_day__lt=bound, then=Value(index)) for index, bound in enumerate(bounds)],
+        default=Value(len(bounds)),
+        output_field=IntegerField(),
+    )
+
+
+def price_bucket_label(index, bounds):
+    low = bounds[index - 1] if index > 0 else 0
+    if index == len(bounds):
+        return {"value": f"{low}+", "min": low, "max": None}
+    return {"value": f"{low}-{bounds[index]}", "min": low, "max": bounds[index]}
+
+
+def facet_counts(queryset):
+    """Counts per city, property type, rooms and price bucket of the listings in queryset.
+
+    One statement: the filtered listings are projected to the facet columns
+    and grouped with GROUPING SETS, one set per facet plus the grand total.
+    Cities are grouped case-insensitively (like the city filter) and shown
+    in their first spelling."""
+    bounds = settings.LISTING_PRICE_BUCKETS
+    inner = queryset.order_by().annotate(
+        facet_city=Lower("city"),
+        facet_price=price_bucket_expression(bounds),
+    ).values("city", "facet_city", "property_type", "rooms", "facet_price")
+    sql, params = inner.query.sql_with_params()
+    facet_sql = f"""
+        SELECT GROUPING(facet_city), GROUPING(property_type), GROUPING(rooms), GROUPING(facet_price),
+               MIN(city), property_type, rooms, facet_price, COUNT(*)
+        FROM ({sql}) AS filtered
+        GROUP BY GROUPING SETS ((facet_city), (property_type), (rooms), (facet_price), ())
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(facet_sql, params)
+        rows = cursor.fetchall()
+
+    result = {"count": 0, **{facet: [] for facet in FACETS}}
+    for *grouping, city, property_type, rooms, price, count in rows:
+        if all(grouping):
+            result["count"] = count
+        elif not grouping[0]:
+            result["city"].append({"value": city, "count": count})
+        elif not grouping[1]:
+            result["property_type"].append({"value": property_type, "count": count})
+        elif not grouping[2]:
+            result["rooms"].append({"value": rooms, "count": count})
+        else:
+            result["price"].append({**price_bucket_label(price, bounds), "count": count, "bucket": price})
+
+    result["city"].sort(key=lambda item: (-item["count"], item["value"]))
+    del result["city"][settings.LISTING_FACET_CITY_LIMIT:]
+    result["property_type"].sort(key=lambda item: (-item["count"], item["value"]))
+    result["rooms"].sort(key=lambda item: item["value"])
+    result["price"].sort(key=lambda item: item.pop("bucket"))
+    return result
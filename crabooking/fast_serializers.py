@@ -0,0 +1,154 @@
+"""Read-only fast path for list serializers over `.values()` rows.
+
+A `ValuesSerializer` mirrors one ModelSerializer: it selects only the
+columns its readable fields need and turns each row into the same dict DRF
+would produce, with one precomputed converter per field instead of model
+instances and `get_attribute`/`to_representation` per value. The output is
+meant to render to byte-identical JSON; `manage.py benchmark_serializers`
+checks that and measures the difference."""
+import decimal
+from operator import itemgetter
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from .serializers import BookingDetailSerializer, ListingListSerializer, ReviewListSerializer
+
+
+def _datetime_converter(field):
+    output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601 or hasattr(field, "timezone"):
+        return field.to_representation
+    tz = timezone.get_current_timezone()
+
+    def convert(value):
+        value = value.astimezone(tz).isoformat()
+        return value[:-6] + "Z" if value.endswith("+00:00") else value
+    return convert
+
+
+def _decimal_converter(field):
+    coerce_to_string = getattr(field, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING)
+    if not coerce_to_string or field.localize or field.normalize_output or field.decimal_places is None:
+        return field.to_representation
+    exp = decimal.Decimal(".1") ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def convert(value):
+        return f"{value.quantize(exp, rounding=rounding, context=context):f}"
+    return convert
+
+
+def _choice_converter(field):
+    choices = field.choice_strings_to_values
+
+    def convert(value):
+        return value if value == "" else choices.get(str(value), value)
+    return convert
+
+
+def converter_for(field):
+    """Value -> representation for a DRF field, for values as `.values()` returns them."""
+    if isinstance(field, serializers.DateTimeField):
+        return _datetime_converter(field)
+    if isinstance(field, serializers.DecimalField):
+        return _decimal_converter(field)
+    if isinstance(field, serializers.ChoiceField):
+        return _choice_converter(field)
+    if isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None:
+        # .values() already gives the related pk
+        return None
+    if isinstance(field, (serializers.IntegerField, serializers.CharField, serializers.BooleanField)):
+        # the DB driver returns these types already
+        return None
+    if isinstance(field, serializers.RelatedField):
+        raise ImproperlyConfigured(f"{field.field_name}: only primary key relations are supported")
+    return field.to_representation
+
+
+class ValuesSerializer:
+    """Fast read-only counterpart of `serializer_class` for `.values()` querysets.
+
+    Fields are taken from `serializer_class`. Fields whose source is not a
+    model column are looked up in `computed` (name -> (columns, function of
+    their values)), else in the queryset's annotations; read-only fields
+    found in neither are left out, as DRF skips missing attributes."""
+    serializer_class = None
+    computed = {}
+
+    def __init__(self, context=None):
+        serializer = self.serializer_class(context=context)
+        self.model = serializer.Meta.model
+        self.fields = [field for field in serializer.fields.values() if not field.write_only]
+        self.plan = None
+
+    def _plan(self, queryset):
+        """[(field name, columns it reads, row -> representation)] for the queryset."""
+        annotations = queryset.query.annotations
+        plan = []
+        for field in self.fields:
+            name, source = field.field_name, field.source
+            if name in self.computed:
+                columns, func = self.computed[name]
+                getter = itemgetter(*columns)
+                if len(columns) == 1:
+                    plan.append((name, columns, lambda row, get=getter, func=func: func(get(row))))
+                else:
+                    plan.append((name, columns, lambda row, get=getter, func=func: func(*get(row))))
+                continue
+            if source not in annotations:
+                try:
+                    model_field = self.model._meta.get_field(source)
+                except FieldDoesNotExist:
+                    model_field = None
+                if model_field is None or not model_field.concrete:
+                    if field.read_only and not field.required:
+                        continue
+                    raise ImproperlyConfigured(f"{name}: source {source!r} is not a column")
+            convert = converter_for(field)
+            if convert is None:
+                getter = itemgetter(source)
+            else:
+                def getter(row, source=source, convert=convert):
+                    value = row[source]
+                    return None if value is None else convert(value)
+            plan.append((name, [source], getter))
+        return plan
+
+    def project(self, queryset, extra=()):
+        """The queryset as `.values()` of the needed columns, the pk, `extra` and all annotations.
+
+        `extra` are e.g. the paginator's ordering columns, which the page
+        positions are read from even when no field outputs them."""
+        plan = self._plan(queryset)
+        self.plan = [(name, getter) for name, _, getter in plan]
+        columns = [self.model._meta.pk.name, *extra]
+        for _, sources, _ in plan:
+            columns.extend(sources)
+        columns.extend(queryset.query.annotations)
+        return queryset.values(*dict.fromkeys(columns))
+
+    def to_representation(self, rows):
+        """ rows of the queryset returned by `project` -> list of dicts """
+        plan = self.plan
+        return [{name: getter(row) for name, getter in plan} for row in rows]
+
+
+class FastListingListSerializer(ValuesSerializer):
+    serializer_class = ListingListSerializer
+    computed = {
+        "rating_histogram": ([f"rating_{stars}_count" for stars in range(1, 6)], lambda *counts: list(counts)),
+    }
+
+
+class FastBookingDetailSerializer(ValuesSerializer):
+    serializer_class = BookingDetailSerializer
+
+
+class FastReviewListSerializer(ValuesSerializer):
+    serializer_class = ReviewListSerializer
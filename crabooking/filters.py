@@ -1,5 +1,26 @@
+import math
+
 import django_filters as df
-from .models import Listing
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Exists, F, FloatField, OuterRef
+from django.db.models.functions import Cast
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import SearchFilter, OrderingFilter
+from . import geo
+from .models import Listing, Booking
+
+
+def parse_floats(value, count, name):
+    try:
+        numbers = [float(part) for part in value.split(",")]
+    except ValueError:
+        numbers = []
+    if len(numbers) != count or not all(map(math.isfinite, numbers)):
+        raise ValidationError({name: f"expected {count} comma separated numbers"})
+    return numbers
+
 
 class ListingFilter(df.FilterSet):
     price_min = df.NumberFilter(field_name="price_per_day", lookup_expr="gte")
@@ -9,7 +30,104 @@ class ListingFilter(df.FilterSet):
     city = df.CharFilter(field_name="city", lookup_expr="iexact")
     property_type = df.CharFilter(field_name="property_type", lookup_expr="iexact")
     is_active = df.BooleanFilter(field_name="is_active")
+    available_from = df.DateFilter(method="filter_available")
+    available_to = df.DateFilter(method="filter_available")
+    bbox = df.CharFilter(method="filter_bbox", help_text="min_lon,min_lat,max_lon,max_lat")
+    near = df.CharFilter(method="filter_near", help_text="lat,lon")
+    radius_km = df.NumberFilter(method="filter_near")
 
     class Meta:
         model = Listing
-        fields = ["price_min","price_max","rooms_min","rooms_max","city","property_type","is_active"]
\ No newline at end of file
+        fields = ["price_min","price_max","rooms_min","rooms_max","city","property_type","is_active",
+                  "available_from","available_to","bbox","near","radius_km"]
+
+    def filter_available(self, queryset, name, value):
+        """Exclude listings with an approved booking overlapping [available_from, available_to].
+
+        Both bounds are applied together by whichever filter runs first; a single
+        bound means that one day. Runs as one NOT EXISTS over the GiST range index."""
+        if getattr(self, "_availability_applied", False):
+            return queryset
+        self._availability_applied = True
+        start = self.form.cleaned_data.get("available_from") or value
+        end = self.form.cleaned_data.get("available_to") or start
+        if start > end:
+            return queryset.none()
+        busy = Booking.approved_overlapping(start, end).filter(listing=OuterRef("pk"))
+        return queryset.filter(~Exists(busy))
+
+    def filter_bbox(self, queryset, name, value):
+        """Listings inside a map viewport; min_lon > max_lon crosses the antimeridian."""
+        min_lon, min_lat, max_lon, max_lat = parse_floats(value, 4, name)
+        if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lon <= 180 and -180 <= max_lon <= 180):
+            raise ValidationError({name: "coordinates out of range"})
+        boxes = geo.split_antimeridian(min_lat, min_lon, max_lat, max_lon)
+        return queryset.filter(geo.boxes_q(boxes, settings.GEO_MAX_COVER_CELLS))
+
+    def filter_near(self, queryset, name, value):
+        """Listings within radius_km of near=lat,lon, annotated with `distance` (km).
+
+        The circle's bounding box narrows rows through the geohash index, the
+        exact distance check runs only on those."""
+        if getattr(self, "_near_applied", False):
+            return queryset
+        self._near_applied = True
+        near = self.form.cleaned_data.get("near")
+        if not near:
+            return queryset
+        lat, lon = parse_floats(near, 2, "near")
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            raise ValidationError({"near": "coordinates out of range"})
+        radius = self.form.cleaned_data.get("radius_km") or settings.GEO_DEFAULT_RADIUS_KM
+        if not 0 < radius <= settings.GEO_MAX_RADIUS_KM:
+            raise ValidationError({"radius_km": f"must be between 0 and {settings.GEO_MAX_RADIUS_KM}"})
+        radius = float(radius)
+        boxes = geo.radius_boxes(lat, lon, radius)
+        return (queryset
+                .filter(geo.boxes_q(boxes, settings.GEO_MAX_COVER_CELLS))
+                .annotate(distance=geo.distance_km(lat, lon))
+                .filter(distance__lte=radius))
+
+class IncomingBookingFilter(df.FilterSet):
+    status = df.ChoiceFilter(choices=Booking.STATUS_CHOICES)
+    listing = df.NumberFilter(field_name="listing_id")
+
+    class Meta:
+        model = Booking
+        fields = ["status","listing"]
+
+class ListingSearchFilter(SearchFilter):
+    """`?search=` as full-text match on `Listing.search_vector` (GIN indexed).
+
+    Accepts websearch syntax ("quoted phrase", -exclude, or) and annotates
+    `rank` so results can be ordered by relevance with `?ordering=-rank`."""
+
+    def filter_queryset(self, request, queryset, view):
+        terms = request.query_params.get(self.search_param, "").strip()
+        if not terms:
+            return queryset
+        query = SearchQuery(terms, search_type="websearch", config=settings.LISTING_SEARCH_CONFIG)
+        # ts_rank is a float4; as double precision the value round-trips through
+        # keyset cursors exactly
+        rank = Cast(SearchRank(F("search_vector"), query), FloatField())
+        return queryset.filter(search_vector=query).annotate(rank=rank)
+
+
+class AnnotationOrderingFilter(OrderingFilter):
+    """OrderingFilter that ignores orderings on annotations the queryset does not have.
+
+    e.g. `rank` only exists when `?search=` is given."""
+
+    def remove_invalid_fields(self, queryset, fields, view, request):
+        valid = super().remove_invalid_fields(queryset, fields, view, request)
+        return [term for term in valid if self._is_available(queryset, term.lstrip("-"))]
+
+    @staticmethod
+    def _is_available(queryset, name):
+        if name in queryset.query.annotations:
+            return True
+        try:
+            queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return False
+        return True
@@ -0,0 +1,113 @@
+"""Geohash cells for 2-D range queries on plain B-tree indexes (no PostGIS).
+
+A listing's coordinates are stored together with their geohash. Every
+geohash prefix is a lat/lon rectangle, so a bounding box is covered by a few
+prefixes, each one a `LIKE 'prefix%'` range scan on the geohash index; exact
+coordinate / distance conditions then drop what lies in the cells but outside
+the box or circle."""
+import math
+
+from django.db.models import F, Q, Value
+from django.db.models.functions import ASin, Cos, Least, Power, Radians, Sin, Sqrt
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+# stored precision, ~5 m cells
+PRECISION = 9
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def encode(lat, lon, precision=PRECISION):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits, value, even = 0, 0, True
+    while len(chars) < precision:
+        rng, coord = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+
+def cell_size(precision):
+    """(height, width) of a cell in degrees."""
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def split_antimeridian(min_lat, min_lon, max_lat, max_lon):
+    """Boxes with min_lon <= max_lon; a box with min_lon > max_lon wraps around 180°."""
+    if min_lon <= max_lon:
+        return [(min_lat, min_lon, max_lat, max_lon)]
+    return [(min_lat, min_lon, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lon)]
+
+
+def cover(boxes, max_cells):
+    """Geohash prefixes covering the boxes: the finest precision needing at most max_cells."""
+    for precision in range(PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        spans = []
+        for min_lat, min_lon, max_lat, max_lon in boxes:
+            rows = math.floor((max_lat + 90) / height) - math.floor((min_lat + 90) / height) + 1
+            cols = math.floor((max_lon + 180) / width) - math.floor((min_lon + 180) / width) + 1
+            spans.append((rows, cols))
+        if sum(rows * cols for rows, cols in spans) <= max_cells or precision == 1:
+            break
+
+    cells = set()
+    for (min_lat, min_lon, _, _), (rows, cols) in zip(boxes, spans):
+        first_row = math.floor((min_lat + 90) / height)
+        first_col = math.floor((min_lon + 180) / width)
+        for row in range(rows):
+            lat = min((first_row + row + 0.5) * height - 90, 90.0)
+            for col in range(cols):
+                lon = min((first_col + col + 0.5) * width - 180, 180.0)
+                cells.add(encode(lat, lon, precision))
+    return sorted(cells)
+
+
+def radius_boxes(lat, lon, radius_km):
+    """Bounding boxes of a circle (split at the antimeridian, whole longitude range near poles)."""
+    dlat = radius_km / KM_PER_DEGREE
+    min_lat, max_lat = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+    if min_lat == -90.0 or max_lat == 90.0:
+        return [(min_lat, -180.0, max_lat, 180.0)]
+    dlon = dlat / math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    if dlon >= 180:
+        return [(min_lat, -180.0, max_lat, 180.0)]
+    min_lon, max_lon = lon - dlon, lon + dlon
+    if min_lon < -180:
+        min_lon += 360
+    if max_lon > 180:
+        max_lon -= 360
+    return split_antimeridian(min_lat, min_lon, max_lat, max_lon)
+
+
+def boxes_q(boxes, max_cells):
+    """Index-backed cell prefixes AND the exact coordinate ranges."""
+    cells = Q()
+    for prefix in cover(boxes, max_cells):
+        cells |= Q(geohash__startswith=prefix)
+    exact = Q()
+    for min_lat, min_lon, max_lat, max_lon in boxes:
+        exact |= Q(latitude__range=(min_lat, max_lat), longitude__range=(min_lon, max_lon))
+    return cells & exact
+
+
+def distance_km(lat, lon):
+    """Haversine distance from (lat, lon) to the row's coordinates, in km."""
+    half_dlat = Radians(F("latitude") - Value(lat)) / 2
+    half_dlon = Radians(F("longitude") - Value(lon)) / 2
+    a = (Power(Sin(half_dlat), 2)
+         + math.cos(math.radians(lat)) * Cos(Radians(F("latitude"))) * Power(Sin(half_dlon), 2))
+    return 2 * EARTH_RADIUS_KM * ASin(Least(Sqrt(a), Value(1.0)))
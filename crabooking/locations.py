@@ -0,0 +1,97 @@
+from django.conf import settings
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.functions import Greatest
+
+from .caching import aget_version, bump_version
+from .models import Listing, Location
+
+CACHE_NAMESPACE = "locations"
+# below this length trigrams carry no signal, only prefix matching is used
+MIN_TRIGRAM_LENGTH = 3
+
+
+def adjust_location(city, district, delta):
+    """Add delta to the active listing count of a city/district pair.
+
+    Suggestions are ranked by that count, so any change drops the cached
+    suggestions once the current transaction commits."""
+    name = Location.make_name(city, district)
+    updated = Location.objects.filter(name=name).update(
+        listing_count=Greatest(F("listing_count") + delta, 0)
+    )
+    if not updated:
+        if delta <= 0:
+            return
+        try:
+            with transaction.atomic():
+                Location.objects.create(city=city, district=district, name=name, listing_count=delta)
+        except IntegrityError:
+            # created concurrently
+            Location.objects.filter(name=name).update(listing_count=F("listing_count") + delta)
+    transaction.on_commit(lambda: bump_version(CACHE_NAMESPACE))
+
+
+def rebuild_locations():
+    """Recompute the dictionary from active listings (full scan, repair only).
+
+    Returns:
+        number of locations with listings"""
+    counts = {}
+    display = {}
+    rows = Listing.objects.filter(is_active=True).values_list("city", "district")
+    for city, district in rows.iterator(chunk_size=5000):
+        name = Location.make_name(city, district)
+        counts[name] = counts.get(name, 0) + 1
+        display.setdefault(name, (city, district))
+
+    with transaction.atomic():
+        Location.objects.update(listing_count=0)
+        Location.objects.bulk_create(
+            [Location(city=city, district=district, name=name, listing_count=counts[name])
+             for name, (city, district) in display.items()],
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["name"],
+            update_fields=["listing_count"],
+        )
+    bump_version(CACHE_NAMESPACE)
+    return len(counts)
+
+
+def suggestion_queryset(q, limit):
+    """Ranked suggestions: prefix matches first, then trigram word similarity (typos)."""
+    q = q.strip().lower()
+    match = Q(name__startswith=q)
+    if len(q) >= MIN_TRIGRAM_LENGTH:
+        match |= Q(name__trigram_word_similar=q)
+    return (Location.objects
+            .filter(match, listing_count__gt=0)
+            .annotate(
+                prefix=Case(When(name__startswith=q, then=Value(1)), default=Value(0), output_field=IntegerField()),
+                similarity=TrigramWordSimilarity(q, "name"),
+            )
+            .order_by("-prefix", "-similarity", "-listing_count", "name")
+            .values("city", "district", "listing_count")[:limit])
+
+
+def _suggestion(row):
+    return {"city": row["city"], "district": row["district"], "listings": row["listing_count"]}
+
+
+def suggest(q, limit):
+    """Suggestions for q, uncached (sync callers such as the browsable API)."""
+    return [_suggestion(row) for row in suggestion_queryset(q, limit)]
+
+
+async def asuggest(q, limit):
+    """Suggestions for q, served from the cache per (normalized prefix, limit)."""
+    key = f"{CACHE_NAMESPACE}:{await aget_version(CACHE_NAMESPACE)}:{limit}:{q.strip().lower()}"
+    results = await cache.aget(key)
+    if results is None:
+        results = [_suggestion(row) async for row in suggestion_queryset(q, limit)]
+        await cache.aset(key, results, timeout=settings.LOCATION_SUGGEST_CACHE_TIMEOUT)
+    return results
+
@@ -0,0 +1,60 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from crabooking.fast_serializers import FastBookingDetailSerializer, FastListingListSerializer, FastReviewListSerializer
+from crabooking.models import Booking, Listing, Review
+
+class Command(BaseCommand):
+    help = "Compare DRF list serializers with their .values() fast path: identical JSON and time per page"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100, help="rows per page")
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        cases = [
+            (FastListingListSerializer, Listing.objects.order_by("-id")),
+            (FastBookingDetailSerializer, Booking.objects.order_by("-id")),
+            (FastReviewListSerializer, Review.objects.order_by("-id")),
+        ]
+        renderer = JSONRenderer()
+        for fast_class, queryset in cases:
+            name = fast_class.serializer_class.__name__
+            queryset = queryset[:options["rows"]]
+
+            # .all(): a fresh query per run, not the result cache
+            def drf():
+                return renderer.render(fast_class.serializer_class(list(queryset.all()), many=True).data)
+
+            def fast():
+                serializer = fast_class()
+                return renderer.render(serializer.to_representation(list(serializer.project(queryset.all()))))
+
+            # serialization alone, rows already fetched
+            objects = list(queryset.all())
+            serializer = fast_class()
+            rows = list(serializer.project(queryset.all()))
+
+            def drf_serialize():
+                return renderer.render(fast_class.serializer_class(objects, many=True).data)
+
+            def fast_serialize():
+                return renderer.render(serializer.to_representation(rows))
+
+            if drf() != fast():
+                raise CommandError(f"{name}: fast path output differs")
+            for label, slow_func, fast_func in (("fetch+serialize", drf, fast),
+                                                ("serialize", drf_serialize, fast_serialize)):
+                slow_time = self._time(slow_func, options["repeat"])
+                fast_time = self._time(fast_func, options["repeat"])
+                self.stdout.write(self.style.SUCCESS(
+                    f"{name} {label}: {len(rows)} rows, drf {slow_time * 1000:.2f} ms, "
+                    f"fast {fast_time * 1000:.2f} ms, x{slow_time / fast_time:.1f}"))
+
+    @staticmethod
+    def _time(func, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        return (time.perf_counter() - start) / repeat
@@ -0,0 +1,47 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from crabooking.archive import archive_bookings, expire_requests, purge_holds
+
+class Command(BaseCommand):
+    help = ("Expire undecided past booking requests, archive bookings that ended long ago "
+            "and delete expired holds, in batches")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=settings.BOOKING_EXPIRY_BATCH_SIZE)
+        parser.add_argument("--archive-after-days", type=int, default=settings.BOOKING_ARCHIVE_AFTER_DAYS,
+                            help="archive bookings whose last day is older than this")
+        parser.add_argument("--loop", action="store_true", help="keep running, one pass every --interval seconds")
+        parser.add_argument("--interval", type=int, default=3600)
+        parser.add_argument("--pause", type=float, default=0.1, help="seconds to sleep between batches")
+
+    def handle(self, *args, **options):
+        while True:
+            expired, archived, purged = self.run_pass(options)
+            self.stdout.write(self.style.SUCCESS(
+                f"Expired {expired} requests, archived {archived} bookings, purged {purged} holds"))
+            if not options["loop"]:
+                return
+            close_old_connections()
+            time.sleep(options["interval"])
+
+    def run_pass(self, options):
+        now = timezone.now()
+        today = now.date()
+        cutoff = today - timedelta(days=options["archive_after_days"])
+        totals = []
+        for step, bound in ((expire_requests, today), (archive_bookings, cutoff), (purge_holds, now)):
+            total = 0
+            while True:
+                done = step(bound, options["batch_size"])
+                total += done
+                if done < options["batch_size"]:
+                    break
+                time.sleep(options["pause"])
+            totals.append(total)
+        return totals
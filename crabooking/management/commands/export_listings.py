@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from crabooking.bulk import FORMATS, export_lines
+from crabooking.models import Listing
+
+class Command(BaseCommand):
+    help = "Stream listings as NDJSON or CSV to a file or stdout"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=list(FORMATS), default="ndjson")
+        parser.add_argument("--output", help="file path, stdout if omitted")
+        parser.add_argument("--active", action="store_true", help="only active listings")
+
+    def handle(self, *args, **options):
+        qs = Listing.objects.all()
+        if options["active"]:
+            qs = qs.filter(is_active=True)
+        lines = export_lines(options["format"], qs)
+        if not options["output"]:
+            for line in lines:
+                self.stdout.write(line, ending="")
+            return
+        total = -1  # header / empty first line
+        with open(options["output"], "w", encoding="utf-8", newline="") as f:
+            for line in lines:
+                f.write(line)
+                total += 1
+        self.stderr.write(self.style.SUCCESS(f"Exported {total} listings to {options['output']}"))
@@ -0,0 +1,25 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from crabooking.bulk import FORMATS, import_listings
+
+class Command(BaseCommand):
+    help = "Import listings for an owner from an NDJSON or CSV file, in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--owner", required=True, help="username of the listings' owner")
+        parser.add_argument("--format", choices=list(FORMATS), default="ndjson")
+        parser.add_argument("--batch-size", type=int, default=None)
+
+    def handle(self, *args, **options):
+        try:
+            owner = User.objects.get(username=options["owner"])
+        except User.DoesNotExist:
+            raise CommandError(f"user {options['owner']} not found")
+        with open(options["path"], encoding="utf-8", newline="") as f:
+            result = import_listings(f, options["format"], owner, batch_size=options["batch_size"])
+        for error in result["errors"]:
+            self.stderr.write(f"line {error['line']}: {json.dumps(error['errors'])}")
+        self.stdout.write(self.style.SUCCESS(f"Imported {result['created']} listings, {result['failed']} rows failed"))
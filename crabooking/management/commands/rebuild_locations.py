@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from crabooking.locations import rebuild_locations
+
+class Command(BaseCommand):
+    help = "Recompute the city/district autocomplete dictionary from active listings"
+
+    def handle(self, *args, **kwargs):
+        total = rebuild_locations()
+        self.stdout.write(self.style.SUCCESS(f"Locations rebuilt: {total}"))
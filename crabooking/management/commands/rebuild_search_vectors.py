@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from crabooking.models import Listing
+from crabooking.search import refresh_search_vectors
+
+class Command(BaseCommand):
+    help = "Recompute listing full-text search vectors in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--missing", action="store_true", help="only listings without a vector")
+
+    def handle(self, *args, **options):
+        qs = Listing.objects.all()
+        if options["missing"]:
+            qs = qs.filter(search_vector__isnull=True)
+        total = refresh_search_vectors(qs, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Search vectors rebuilt for {total} listings"))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from crabooking.ratings import recompute_ratings
+
+class Command(BaseCommand):
+    help = "Recompute listing rating aggregates (avg, count, histogram) from reviews"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = recompute_ratings(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Ratings recomputed for {total} listings"))
@@ -1,18 +1,54 @@
-from django.http import JsonResponse
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.http import HttpResponse, JsonResponse
 from django.utils.deprecation import MiddlewareMixin
-from django.urls import resolve
+from django.urls import reverse, NoReverseMatch
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from rest_framework_simplejwt.tokens import RefreshToken, AccessToken
-from rest_framework_simplejwt.exceptions import TokenError
+from django.core.cache import cache
+from rest_framework_simplejwt.tokens import AccessToken
+from .tokens import RefreshToken, refresh_result_key
+from rest_framework_simplejwt.exceptions import TokenError, TokenBackendError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.state import token_backend
+from whitenoise.middleware import WhiteNoiseMiddleware
 from datetime import datetime, timezone
-import jwt
 import json
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoise that keeps the ASGI middleware chain async.
+
+    `WhiteNoiseMiddleware` is sync-only, so under ASGI Django would wrap it
+    (and everything after it) in thread hops on every request. Here the
+    lookup in the prebuilt file table runs on the event loop; only a static
+    hit is served through `sync_to_async` (it opens the file)."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
+
+
 class JWTAuthenticationMiddleware(MiddlewareMixin):
     """JWT authentication middleware handling token validation and rotation.
 
@@ -21,8 +57,45 @@ class JWTAuthenticationMiddleware(MiddlewareMixin):
     - Refresh tokens are valid and rotate as needed
     
     Excludes specific paths from authentication requirements.
-    Manages CSRF protection for non-GET requests using double token strategy."""
+    Manages CSRF protection for non-GET requests using double token strategy.
+
+    Works in both sync (WSGI) and async (ASGI) stacks; in async mode the
+    request is handled on the event loop except for token refresh.
+
+    The access token is decoded only once: the verified token (and the user,
+    when it is already known) is attached to the request as `_jwt_token` /
+    `_jwt_user` and reused by `crabooking.authentication.CookieJWTAuthentication`."""
     EXCLUDED_PATHS = ['login', 'registration', 'logout']
+    CSRF_RESPONSE_HEADER = 'X-CSRF-Token'
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self._excluded_exact, self._excluded_prefixes = self._build_path_table()
+
+    def _build_path_table(self):
+        """Compile the paths that skip token work, once at startup.
+
+        Returns:
+            (set of exact paths, tuple of path prefixes)
+
+        Exact paths are the reversed `EXCLUDED_PATHS` url names plus
+        `JWT_AUTH_EXEMPT_PATHS`; prefixes come from `JWT_AUTH_EXEMPT_PREFIXES`
+        and `STATIC_URL`. Matching is a set lookup plus one `str.startswith`,
+        so probes and static files never walk the URLconf."""
+        exact = set(getattr(settings, 'JWT_AUTH_EXEMPT_PATHS', ()))
+        for name in self.EXCLUDED_PATHS:
+            try:
+                exact.add(reverse(name))
+            except NoReverseMatch:
+                logger.warning(f"Excluded url name {name!r} does not resolve")
+
+        prefixes = list(getattr(settings, 'JWT_AUTH_EXEMPT_PREFIXES', ()))
+        if settings.STATIC_URL:
+            prefixes.append('/' + settings.STATIC_URL.lstrip('/'))
+        return exact, tuple(prefixes)
+
+    def _is_excluded(self, path):
+        return path in self._excluded_exact or path.startswith(self._excluded_prefixes)
 
     def process_request(self, request):
         """Authenticate request using JWT tokens.
@@ -34,21 +107,58 @@ class JWTAuthenticationMiddleware(MiddlewareMixin):
             None or HttpResponse if authentication fails
 
         Steps:
-        1. Skip excluded paths
+        1. Skip excluded paths and requests without token cookies
         2. Check access token validity and expiration
         3. Handle token refresh when needed
         4. Validate CSRF for non-GET requests
-        5. Set authorization headers and meta variables"""
-        match = resolve(request.path_info)
-        if match.url_name in self.EXCLUDED_PATHS:
+        5. Set authorization headers and meta variables
+        6. Attach the verified token (and user) for the DRF authentication class"""
+        state = self._check_access_token(request)
+        if state is None:
+            return
+        if state['need_refresh'] and state['refresh_token']:
+            if not self._refresh_request(request, state):
+                return
+        return self._authorize(request, state)
+
+    async def aprocess_request(self, request):
+        """Async twin of `process_request` used when served over ASGI.
+
+        Token verification and CSRF checks are pure CPU and run on the event
+        loop; only the refresh branch (user lookup, blacklist writes) goes
+        through `sync_to_async`."""
+        state = self._check_access_token(request)
+        if state is None:
             return
+        if state['need_refresh'] and state['refresh_token']:
+            if not await sync_to_async(self._refresh_request)(request, state):
+                return
+        return self._authorize(request, state)
+
+    async def __acall__(self, request):
+        response = await self.aprocess_request(request)
+        response = response or await self.get_response(request)
+        return self.process_response(request, response)
+
+    def _check_access_token(self, request):
+        """Read token cookies and verify the access token.
+
+        Returns:
+            None if the request needs no token work, otherwise a state dict
+            with refresh_token, need_refresh, valid_access_token and token"""
+        if self._is_excluded(request.path_info):
+            return None
         
         access_token = request.COOKIES.get('access_token')
         refresh_token = request.COOKIES.get('refresh_token')
+        if not access_token and not refresh_token:
+            # anonymous request, nothing to verify
+            return None
         
         # acces token flags
         need_refresh = False
         valid_access_token = None
+        token = None
         
         if access_token:
             try:
@@ -65,80 +175,166 @@ class JWTAuthenticationMiddleware(MiddlewareMixin):
         else:
             # token in cookies
             need_refresh = True
-        
-        if need_refresh and refresh_token:
-            try:
-                refresh = RefreshToken(refresh_token)
-                
-                user_id = refresh.payload.get('user_id')
-                if not user_id:
-                    raise TokenError("No user_id in refresh token")
-                
-                try:
-                    user = User.objects.get(pk=user_id)
-                except User.DoesNotExist:
-                    raise TokenError("User not found")
-                
-                new_access = refresh.access_token
-                #print(f'new_access: {new_access}')
-                rotation_flag = False
-                if settings.SIMPLE_JWT.get('ROTATE_REFRESH_TOKENS', False) and self._is_token_expiring_soon(refresh, settings.REFRESH_TOKEN_THRESHOLD):
-                    if settings.SIMPLE_JWT.get('BLACKLIST_AFTER_ROTATION', False):
-                        try:
-                            refresh.blacklist()
-                        except AttributeError:
-                            pass
-                    
-                    new_refresh = RefreshToken.for_user(user)
-                    rotation_flag = True
-                else:
-                    # use old refresh
-                    new_refresh = refresh
-                
-                csrf_token = self._generate_csrf_token()
-                new_access['csrf'] = csrf_token
-                #print(f'new csft: {csrf_token}')
-                if rotation_flag:
-                    request._new_tokens = {
-                        'access': str(new_access),
-                        'refresh': str(new_refresh),
-                        'csrf': csrf_token
-                    }
-                else:
-                    request._new_tokens = {
-                        'access': str(new_access),
-                        'csrf': csrf_token
-                    }
 
-                
-                valid_access_token = str(new_access)
-                logger.info(f"Successfully refreshed tokens for user {user.username}")
-                
-            except TokenError as e:
-                # user must relog
-                logger.warning(f"Refresh token invalid: {e}")
-                request._auth_failed = True
-                return
-            except Exception as e:
-                logger.error(f"Unexpected error during token refresh: {e}")
-                request._auth_failed = True
-                return
-        
+        return {
+            'refresh_token': refresh_token,
+            'need_refresh': need_refresh,
+            'valid_access_token': valid_access_token,
+            'token': token,
+        }
+
+    def _refresh_request(self, request, state):
+        """Refresh tokens for the request, updating state in place.
+
+        Returns:
+            False if the user must log in again (request marked `_auth_failed`)"""
+        try:
+            request._new_tokens, state['token'], user = self._refresh_tokens(state['refresh_token'])
+            state['valid_access_token'] = request._new_tokens['access']
+            if user is not None:
+                request._jwt_user = user
+            return True
+        except TokenError as e:
+            # user must relog
+            logger.warning(f"Refresh token invalid: {e}")
+        except Exception as e:
+            logger.error(f"Unexpected error during token refresh: {e}")
+        request._auth_failed = True
+        return False
+
+    def _authorize(self, request, state):
+        """Expose the verified token to DRF and validate CSRF for unsafe methods."""
+        valid_access_token = state['valid_access_token']
+        token = state['token']
         # set meta
         if valid_access_token:
             request.META['HTTP_AUTHORIZATION'] = f'Bearer {valid_access_token}'
+            request._jwt_token = token
             
             # CSRF for non GET requests
             if request.method not in ['GET', 'HEAD', 'OPTIONS']:
-                self._validate_csrf(request, valid_access_token)
+                self._validate_csrf(request, token)
                 if hasattr(request, '_csrf_failed') and request._csrf_failed:
                     return JsonResponse(
                         {'error': 'CSRF validation failed!!111', 'code': 'csrf_failed'},
                         status=403
                     )
-        elif not need_refresh:
+        elif not state['need_refresh']:
             request._auth_failed = True
     
+    def _refresh_tokens(self, refresh_token):
+        """Refresh tokens, coalescing concurrent refreshes of the same token if enabled.
+
+        With `TOKEN_REFRESH_SINGLE_FLIGHT` the first request for a refresh token JTI
+        takes a short lock in the shared cache and performs the rotation; parallel
+        requests (from any worker) carrying the same refresh token wait for and reuse
+        its result for `TOKEN_REFRESH_COALESCE_WINDOW` seconds instead of hitting the
+        blacklist tables and minting competing tokens.
+
+        Returns:
+            (tokens dict for cookies, new AccessToken, user or None when reused)"""
+        if not getattr(settings, 'TOKEN_REFRESH_SINGLE_FLIGHT', False):
+            return self._rotate_tokens(refresh_token)
+
+        # signature/expiry check only - the blacklist lookup happens in _rotate_tokens,
+        # the winner may already have blacklisted this very token
+        try:
+            payload = token_backend.decode(refresh_token, verify=True)
+        except TokenBackendError as e:
+            raise TokenError(e)
+        if payload.get(jwt_settings.TOKEN_TYPE_CLAIM) != RefreshToken.token_type:
+            raise TokenError("Token has wrong type")
+        jti = payload.get(jwt_settings.JTI_CLAIM)
+        if not jti:
+            raise TokenError("No jti in refresh token")
+
+        result_key = refresh_result_key(jti)
+        lock_key = f'jwt-refresh:{jti}:lock'
+        window = settings.TOKEN_REFRESH_COALESCE_WINDOW
+
+        shared = cache.get(result_key)
+        if shared is None:
+            if cache.add(lock_key, 1, timeout=window):
+                try:
+                    tokens, new_access, user = self._rotate_tokens(refresh_token)
+                    cache.set(result_key, tokens, timeout=window)
+                finally:
+                    cache.delete(lock_key)
+                return tokens, new_access, user
+
+            shared = self._wait_for_refresh(result_key, lock_key)
+            if shared is None:
+                # winner failed or is too slow, refresh on our own
+                logger.debug("Coalesced refresh timed out, refreshing directly")
+                return self._rotate_tokens(refresh_token)
+
+        logger.debug(f"Reusing coalesced token refresh for jti {jti}")
+        return dict(shared), AccessToken(shared['access']), None
+
+    def _wait_for_refresh(self, result_key, lock_key):
+        """Poll the shared cache for the result of a refresh running elsewhere.
+
+        Gives up as soon as the lock is released without a result (the
+        winner failed) or after `TOKEN_REFRESH_LOCK_WAIT` seconds."""
+        deadline = time.monotonic() + settings.TOKEN_REFRESH_LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            shared = cache.get(result_key)
+            if shared is not None:
+                return shared
+            if cache.get(lock_key) is None:
+                # released in between the two reads: the result may have just landed
+                return cache.get(result_key)
+        return None
+
+    def _rotate_tokens(self, refresh_token):
+        """Issue a new access token (and a rotated refresh token if needed).
+
+        Returns:
+            (tokens dict for cookies, new AccessToken, user)"""
+        refresh = RefreshToken(refresh_token)
+        
+        user_id = refresh.payload.get('user_id')
+        if not user_id:
+            raise TokenError("No user_id in refresh token")
+        
+        try:
+            user = User.objects.get(pk=user_id)
+        except User.DoesNotExist:
+            raise TokenError("User not found")
+        
+        new_access = refresh.access_token
+        rotation_flag = False
+        if settings.SIMPLE_JWT.get('ROTATE_REFRESH_TOKENS', False) and self._is_token_expiring_soon(refresh, settings.REFRESH_TOKEN_THRESHOLD):
+            if settings.SIMPLE_JWT.get('BLACKLIST_AFTER_ROTATION', False):
+                try:
+                    refresh.blacklist()
+                except AttributeError:
+                    pass
+            
+            new_refresh = RefreshToken.for_user(user)
+            rotation_flag = True
+        else:
+            # use old refresh
+            new_refresh = refresh
+        
+        csrf_token = self._generate_csrf_token()
+        new_access['csrf'] = csrf_token
+        if rotation_flag:
+            tokens = {
+                'access': str(new_access),
+                'refresh': str(new_refresh),
+                'csrf': csrf_token
+            }
+        else:
+            tokens = {
+                'access': str(new_access),
+                'csrf': csrf_token
+            }
+        
+        logger.info(f"Successfully refreshed tokens for user {user.username}")
+        return tokens, new_access, user
+
     def _is_token_expiring_soon(self, token, threshold):
         """ checks if token expiring in threshold time """
         try:
@@ -159,24 +355,14 @@ class JWTAuthenticationMiddleware(MiddlewareMixin):
         import secrets
         return secrets.token_urlsafe(32)
     
-    def _validate_csrf(self, request, access_token):
-        """ validate CSRF for Double Token Strategy """
-        try:
-            payload = jwt.decode(
-                access_token,
-                settings.SECRET_KEY,
-                algorithms=[settings.CSRF_TOKEN_ALGORITHM]
-            )
-            
-            csrf_from_token = payload.get('csrf')
-            csrf_from_header = request.headers.get('X-CSRF-Token')
-            
-            if not csrf_from_header or csrf_from_token != csrf_from_header:
-                request._csrf_failed = True
-                logger.warning("CSRF validation failed")
-                
-        except jwt.InvalidTokenError:
+    def _validate_csrf(self, request, token):
+        """ validate CSRF for Double Token Strategy against the already verified token """
+        csrf_from_token = token.payload.get('csrf')
+        csrf_from_header = request.headers.get('X-CSRF-Token')
+        
+        if not csrf_from_header or csrf_from_token != csrf_from_header:
             request._csrf_failed = True
+            logger.warning("CSRF validation failed")
     
     def process_response(self, request, response):
         """Handle response after authentication processing.
@@ -186,7 +372,14 @@ class JWTAuthenticationMiddleware(MiddlewareMixin):
             response: Django HTTP response object
 
         Returns:
-            Response with updated headers and cookies if new tokens were generated."""
+            Response with updated headers and cookies if new tokens were generated.
+            A rotated CSRF token is sent in the `X-CSRF-Token` response header
+            (and injected into the JSON body only when `JWT_CSRF_IN_BODY` is on)."""
+        if response.streaming and (hasattr(request, '_auth_failed') or hasattr(request, '_csrf_failed')):
+            # a streamed body cannot be replaced, answer with a plain response instead
+            response.close()
+            response = HttpResponse()
+
         if hasattr(request, '_auth_failed'):
             response.status_code = 401
             response.content = json.dumps({
@@ -232,7 +425,13 @@ class JWTAuthenticationMiddleware(MiddlewareMixin):
                     path='/'
                 )
             
-            if response.get('Content-Type', '') == 'application/json':
+            # the rotated CSRF token travels in a header, the body is never touched
+            response[self.CSRF_RESPONSE_HEADER] = tokens['csrf']
+            
+            # legacy clients read csrf_token from the JSON body (opt-in, costs a re-parse)
+            if (getattr(settings, 'JWT_CSRF_IN_BODY', False)
+                    and not response.streaming
+                    and response.get('Content-Type', '') == 'application/json'):
                 try:
                     data = json.loads(response.content)
                     data['csrf_token'] = tokens['csrf']
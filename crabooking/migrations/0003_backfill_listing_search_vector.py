@@ -0,0 +1,39 @@
+# Generated by Django 5.2.5 on 2026-10-18 08:25
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def backfill_search_vectors(apps, schema_editor):
+    Listing = apps.get_model("crabooking", "Listing")
+    config = settings.LISTING_SEARCH_CONFIG
+    vector = SearchVector("title", weight="A", config=config) + SearchVector(
+        "description", weight="B", config=config
+    )
+    last_id = 0
+    while True:
+        ids = list(
+            Listing.objects.filter(pk__gt=last_id, search_vector__isnull=True)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:BATCH_SIZE]
+        )
+        if not ids:
+            break
+        Listing.objects.filter(pk__in=ids).update(search_vector=vector)
+        last_id = ids[-1]
+
+
+class Migration(migrations.Migration):
+    # every batch commits on its own, no long lock on crabooking_listing
+    atomic = False
+
+    dependencies = [
+        ("crabooking", "0002_listing_search_vector"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_search_vectors, migrations.RunPython.noop),
+    ]
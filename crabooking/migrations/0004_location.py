@@ -0,0 +1,61 @@
+# Generated by Django 5.2.5 on 2026-10-18 08:23
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+def populate_locations(apps, schema_editor):
+    Listing = apps.get_model("crabooking", "Listing")
+    Location = apps.get_model("crabooking", "Location")
+    locations = {}
+    rows = Listing.objects.filter(is_active=True).values_list("city", "district")
+    for city, district in rows.iterator(chunk_size=5000):
+        name = f"{city} {district}".strip().lower()
+        if name in locations:
+            locations[name].listing_count += 1
+        else:
+            locations[name] = Location(
+                city=city, district=district, name=name, listing_count=1
+            )
+    Location.objects.bulk_create(locations.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("crabooking", "0003_backfill_listing_search_vector"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.CreateModel(
+            name="Location",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("city", models.CharField(max_length=80)),
+                ("district", models.CharField(blank=True, max_length=80)),
+                ("name", models.CharField(max_length=161, unique=True)),
+                ("listing_count", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "indexes": [
+                    django.contrib.postgres.indexes.GinIndex(
+                        django.contrib.postgres.indexes.OpClass(
+                            "name", name="gin_trgm_ops"
+                        ),
+                        name="location_name_trgm_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(populate_locations, migrations.RunPython.noop),
+    ]
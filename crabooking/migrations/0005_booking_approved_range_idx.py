@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-18 08:24
+
+import crabooking.models
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("crabooking", "0004_location"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        BtreeGistExtension(),
+        migrations.AddIndex(
+            model_name="booking",
+            index=django.contrib.postgres.indexes.GistIndex(
+                models.F("listing"),
+                crabooking.models.DateRangeFunc(
+                    "date_from", "date_to", models.Value("[]")
+                ),
+                condition=models.Q(("status", "APPROVED")),
+                name="booking_approved_range_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 5.2.5 on 2026-10-18 08:25
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_ratings(apps, schema_editor):
+    Listing = apps.get_model("crabooking", "Listing")
+    Review = apps.get_model("crabooking", "Review")
+    rows = (
+        Review.objects.order_by()
+        .values("listing_id")
+        .annotate(
+            n=Count("id"),
+            total=Sum("rating"),
+            **{f"stars_{i}": Count("id", filter=Q(rating=i)) for i in range(1, 6)},
+        )
+    )
+    for row in rows.iterator():
+        Listing.objects.filter(pk=row["listing_id"]).update(
+            rating_count=row["n"],
+            rating_sum=row["total"],
+            rating_avg=round(row["total"] / row["n"], 2),
+            **{f"rating_{i}_count": row[f"stars_{i}"] for i in range(1, 6)},
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("crabooking", "0005_booking_approved_range_idx"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="listing",
+            name="rating_1_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="listing",
+            name="rating_2_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="listing",
+            name="rating_3_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="listing",
+            name="rating_4_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="listing",
+            name="rating_5_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="listing",
+            name="rating_avg",
+            field=models.DecimalField(
+                decimal_places=2, default=0, editable=False, max_digits=3
+            ),
+        ),
+        migrations.AddField(
+            model_name="listing",
+            name="rating_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="listing",
+            name="rating_sum",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="listing",
+            index=models.Index(fields=["rating_avg"], name="listing_rating_idx"),
+        ),
+        migrations.RunPython(backfill_ratings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.5 on 2026-10-18 08:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("crabooking", "0006_listing_rating_aggregates"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="listing",
+            name="listing_price_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="listing",
+            name="listing_created_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="listing",
+            name="listing_rating_idx",
+        ),
+        migrations.AddIndex(
+            model_name="listing",
+            index=models.Index(
+                fields=["price_per_day", "id"], name="listing_price_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="listing",
+            index=models.Index(
+                fields=["created_at", "id"], name="listing_created_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="listing",
+            index=models.Index(
+                fields=["rating_avg", "id"], name="listing_rating_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="listing",
+            index=models.Index(
+                fields=["rating_count", "id"], name="listing_rating_count_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(
+                fields=["listing", "created_at", "id"],
+                name="review_listing_created_idx",
+            ),
+        ),
+    ]
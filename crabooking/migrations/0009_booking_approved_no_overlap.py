@@ -0,0 +1,68 @@
+# Generated by Django 5.2.5 on 2026-10-18 08:44
+
+import crabooking.models
+import django.contrib.postgres.constraints
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def check_no_overlaps(apps, schema_editor):
+    """Stop before adding the constraint if approved stays already overlap.
+
+    Which booking of a pair to keep is for the landlords to decide, so the
+    conflicts are listed for manual cleanup instead of being cancelled here."""
+    Booking = apps.get_model("crabooking", "Booking")
+    approved = Booking.objects.using(schema_editor.connection.alias).filter(
+        status="APPROVED"
+    )
+    earlier = approved.filter(
+        listing_id=OuterRef("listing_id"),
+        pk__lt=OuterRef("pk"),
+        date_from__lte=OuterRef("date_to"),
+        date_to__gte=OuterRef("date_from"),
+    )
+    conflicts = [
+        f"booking {pk} (listing {listing_id}, {date_from}..{date_to})"
+        for pk, listing_id, date_from, date_to in approved.filter(Exists(earlier))
+        .order_by("listing_id", "pk")
+        .values_list("pk", "listing_id", "date_from", "date_to")
+    ]
+    if conflicts:
+        raise RuntimeError(
+            "Approved bookings overlap an earlier approved booking of the same "
+            "listing; cancel or reject them before migrating:\n  "
+            + "\n  ".join(conflicts)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("crabooking", "0008_listing_coordinates"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(check_no_overlaps, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name="booking",
+            name="booking_approved_range_idx",
+        ),
+        migrations.AddConstraint(
+            model_name="booking",
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(
+                condition=models.Q(("status", "APPROVED")),
+                expressions=[
+                    (models.F("listing"), "="),
+                    (
+                        crabooking.models.DateRangeFunc(
+                            "date_from", "date_to", models.Value("[]")
+                        ),
+                        "&&",
+                    ),
+                ],
+                name="booking_approved_no_overlap",
+            ),
+        ),
+    ]
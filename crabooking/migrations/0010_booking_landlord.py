@@ -0,0 +1,81 @@
+# Generated by Django 5.2.5 on 2026-10-18 08:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_landlord(apps, schema_editor):
+    Booking = apps.get_model("crabooking", "Booking")
+    Listing = apps.get_model("crabooking", "Listing")
+    Booking.objects.update(
+        landlord_id=Subquery(
+            Listing.objects.filter(pk=OuterRef("listing_id")).values("owner_id")
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("crabooking", "0009_booking_approved_no_overlap"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="booking",
+            name="landlord",
+            field=models.ForeignKey(
+                db_index=False,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="incoming_bookings",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.RunPython(backfill_landlord, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="booking",
+            name="landlord",
+            field=models.ForeignKey(
+                db_index=False,
+                editable=False,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="incoming_bookings",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="booking",
+            name="tenant",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="bookings",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(
+                fields=["tenant", "created_at", "id"], name="booking_tenant_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(
+                fields=["landlord", "created_at", "id"],
+                name="booking_landlord_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(
+                fields=["landlord", "status", "created_at", "id"],
+                name="booking_landlord_status_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,108 @@
+# Generated by Django 5.2.5 on 2026-10-18 08:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("crabooking", "0010_booking_landlord"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BookingArchive",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("date_from", models.DateField()),
+                ("date_to", models.DateField()),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("REQUESTED", "Requested"),
+                            ("APPROVED", "Approved"),
+                            ("REJECTED", "Rejected"),
+                            ("CANCELLED", "Cancelled"),
+                            ("EXPIRED", "Expired"),
+                        ],
+                        max_length=16,
+                    ),
+                ),
+                ("created_at", models.DateTimeField()),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name="booking",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("REQUESTED", "Requested"),
+                    ("APPROVED", "Approved"),
+                    ("REJECTED", "Rejected"),
+                    ("CANCELLED", "Cancelled"),
+                    ("EXPIRED", "Expired"),
+                ],
+                default="REQUESTED",
+                max_length=16,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(
+                condition=models.Q(("status", "REQUESTED")),
+                fields=["date_from"],
+                name="booking_requested_start_idx",
+            ),
+        ),
+        migrations.AddField(
+            model_name="bookingarchive",
+            name="landlord",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="archived_incoming_bookings",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddField(
+            model_name="bookingarchive",
+            name="listing",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="archived_bookings",
+                to="crabooking.listing",
+            ),
+        ),
+        migrations.AddField(
+            model_name="bookingarchive",
+            name="tenant",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="archived_bookings",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="bookingarchive",
+            index=models.Index(
+                fields=["listing", "tenant", "status"], name="booking_archive_stay_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="bookingarchive",
+            index=models.Index(fields=["tenant"], name="booking_archive_tenant_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="bookingarchive",
+            index=models.Index(
+                fields=["landlord"], name="booking_archive_landlord_idx"
+            ),
+        ),
+    ]
@@ -1,13 +1,31 @@
 from django.conf import settings
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateRangeField, RangeOperators
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
-from django.db.models import Q
+from django.db.models import F, Func, Q, Value
+from django.db.backends.postgresql.psycopg_any import DateRange
 from django.db.models.functions import Lower
 from django.utils import timezone
 
+from . import geo
+
 # Create your models here.
 
 User = settings.AUTH_USER_MODEL
 
+
+class DateRangeFunc(Func):
+    function = "daterange"
+    output_field = DateRangeField()
+
+
+def stay_period(start="date_from", end="date_to"):
+    """Inclusive daterange of a stay, date_to is the last occupied day."""
+    return DateRangeFunc(start, end, Value("[]"))
+
 class Profile(models.Model):
     TENANT = "TENANT"
     LANDLORD = "LANDLORD"
@@ -36,31 +54,120 @@ class Listing(models.Model):
     rooms = models.PositiveSmallIntegerField()
     property_type = models.CharField(max_length=16, choices=TYPE_CHOICES, default=APARTMENT)
     is_active = models.BooleanField(default=True)
+    latitude = models.FloatField(null=True, blank=True,
+                                 validators=[MinValueValidator(-90), MaxValueValidator(90)])
+    longitude = models.FloatField(null=True, blank=True,
+                                  validators=[MinValueValidator(-180), MaxValueValidator(180)])
+    # geohash of the coordinates ("" without them), set on save; see crabooking.geo
+    geohash = models.CharField(max_length=geo.PRECISION, blank=True, default="", editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # weighted title/description tsvector, kept in sync by signals.py
+    search_vector = SearchVectorField(null=True, editable=False)
+    # review aggregates, maintained by crabooking.ratings
+    rating_avg = models.DecimalField(max_digits=3, decimal_places=2, default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_1_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_2_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_3_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_4_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_5_count = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ["-created_at"]
         indexes = [
             models.Index(Lower("city"), name="listing_city_lower_idx"),
-            models.Index(fields=["price_per_day"], name="listing_price_idx"),
+            GinIndex(fields=["search_vector"], name="listing_search_gin_idx"),
             models.Index(fields=["rooms"], name="listing_rooms_idx"),
-            models.Index(fields=["created_at"], name="listing_created_idx"),
+            # (ordering field, id): keyset pages for every ?ordering= are index range scans
+            models.Index(fields=["price_per_day", "id"], name="listing_price_id_idx"),
+            models.Index(fields=["created_at", "id"], name="listing_created_id_idx"),
+            models.Index(fields=["rating_avg", "id"], name="listing_rating_id_idx"),
+            models.Index(fields=["rating_count", "id"], name="listing_rating_count_id_idx"),
+            # pattern ops: bbox cells are prefix (LIKE 'abc%') range scans in any collation
+            models.Index(fields=["geohash"], name="listing_geohash_idx", opclasses=["varchar_pattern_ops"]),
         ]
 
     def __str__(self):
         return f"{self.title} {self.city} {self.price_per_day}€"
 
+    def save(self, *args, **kwargs):
+        self.set_geohash()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"latitude", "longitude"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "geohash"}
+        super().save(*args, **kwargs)
+
+    def set_geohash(self):
+        """ derive `geohash` from the coordinates (save does it, bulk_create does not) """
+        if self.latitude is None or self.longitude is None:
+            self.geohash = ""
+        else:
+            self.geohash = geo.encode(self.latitude, self.longitude)
+
+    @property
+    def rating_histogram(self):
+        """ review counts for 1..5 stars """
+        return [getattr(self, f"rating_{stars}_count") for stars in range(1, 6)]
+
+    @staticmethod
+    def search_vector_expression():
+        config = settings.LISTING_SEARCH_CONFIG
+        return (
+            SearchVector("title", weight="A", config=config)
+            + SearchVector("description", weight="B", config=config)
+        )
+
+
+class Location(models.Model):
+    """Distinct city/district pairs of active listings for the autocomplete endpoint.
+
+    Kept up to date incrementally by signals.py (`listing_count` = active
+    listings there), `rebuild_locations` recomputes it from scratch."""
+    city = models.CharField(max_length=80)
+    district = models.CharField(max_length=80, blank=True)
+    # lower("city district"), what suggestions are matched against
+    name = models.CharField(max_length=161, unique=True)
+    listing_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            GinIndex(OpClass("name", name="gin_trgm_ops"), name="location_name_trgm_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.listing_count})"
+
+    @staticmethod
+    def make_name(city, district):
+        return f"{city} {district}".strip().lower()
+
 
 class Booking(models.Model):
     REQUESTED = "REQUESTED"
     APPROVED = "APPROVED"
     REJECTED = "REJECTED"
     CANCELLED = "CANCELLED"
-    STATUS_CHOICES = [(REQUESTED,"Requested"),(APPROVED,"Approved"),(REJECTED,"Rejected"),(CANCELLED,"Cancelled")]
+    # a request nobody decided before its first day, set by `expire_bookings`
+    EXPIRED = "EXPIRED"
+    STATUS_CHOICES = [(REQUESTED,"Requested"),(APPROVED,"Approved"),(REJECTED,"Rejected"),(CANCELLED,"Cancelled"),
+                      (EXPIRED,"Expired")]
+    # action -> statuses it applies to, resulting status, who may perform it
+    # (the booking's landlord or tenant field); an APPROVED stay can only be
+    # left before it starts
+    TRANSITIONS = {
+        "approve": {"from": (REQUESTED,), "to": APPROVED, "actor": "landlord"},
+        "reject": {"from": (REQUESTED,), "to": REJECTED, "actor": "landlord"},
+        "cancel": {"from": (REQUESTED, APPROVED), "to": CANCELLED, "actor": "tenant"},
+    }
 
     listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name="bookings")
-    tenant = models.ForeignKey(User, on_delete=models.PROTECT, related_name="bookings")
+    # indexed by booking_tenant_created_idx / booking_landlord_created_idx
+    tenant = models.ForeignKey(User, on_delete=models.PROTECT, related_name="bookings", db_index=False)
+    # the listing's owner, copied on create for the landlord feed
+    landlord = models.ForeignKey(User, on_delete=models.PROTECT, related_name="incoming_bookings",
+                                 editable=False, db_index=False)
     date_from = models.DateField()
     date_to = models.DateField()
     status = models.CharField(max_length=16 , choices=STATUS_CHOICES, default=REQUESTED)
@@ -70,19 +177,94 @@ class Booking(models.Model):
         ordering = ["-created_at"]
         indexes = [
             models.Index(fields=["listing","status","date_from","date_to"], name="booking_main_idx"),
+            # keyset feeds: /bookings/mine/ and /bookings/incoming/ (optionally by status)
+            models.Index(fields=["tenant","created_at","id"], name="booking_tenant_created_idx"),
+            models.Index(fields=["landlord","created_at","id"], name="booking_landlord_created_idx"),
+            models.Index(fields=["landlord","status","created_at","id"], name="booking_landlord_status_idx"),
+            # expire_bookings: undecided requests by first day
+            models.Index(fields=["date_from"], condition=Q(status="REQUESTED"), name="booking_requested_start_idx"),
+        ]
+        constraints = [
+            # approved stays of a listing never overlap; the constraint's GiST index
+            # (needs btree_gist for listing) also serves the overlap lookups
+            ExclusionConstraint(
+                name="booking_approved_no_overlap",
+                expressions=[(F("listing"), RangeOperators.EQUAL), (stay_period(), RangeOperators.OVERLAPS)],
+                condition=Q(status="APPROVED"),
+            ),
         ]
 
     def __str__(self):
         return f"{self.listing_id} {self.tenant_id} {self.date_from}->{self.date_to} [{self.status}]"
 
+    def save(self, *args, **kwargs):
+        if self.landlord_id is None and self.listing_id is not None:
+            self.landlord_id = self.listing.owner_id
+        super().save(*args, **kwargs)
+
     @staticmethod
-    def overlaps_approved(listing_id, start, end):
-        return Booking.objects.filter(
-            listing_id=listing_id,
-            status=Booking.APPROVED,
-        ).filter(
-            Q(date_from__lte=end) & Q(date_to__gte=start)
-        ).exists()
+    def approved_overlapping(start, end):
+        """ approved bookings sharing at least one day with [start, end] """
+        return Booking.objects.filter(status=Booking.APPROVED).alias(
+            period=stay_period()
+        ).filter(period__overlap=DateRange(start, end, "[]"))
+
+
+class BookingHold(models.Model):
+    """A tenant's short-lived claim on dates while deciding to book (see quotes.py).
+
+    Requests of other tenants overlapping an unexpired hold are refused.
+    Expired holds are ignored by reads; they are deleted when the listing
+    gets its next hold or booking request, and in batches by
+    `expire_bookings`."""
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name="holds", db_index=False)
+    tenant = models.ForeignKey(User, on_delete=models.CASCADE, related_name="booking_holds")
+    date_from = models.DateField()
+    date_to = models.DateField()
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["listing","expires_at"], name="booking_hold_listing_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.listing_id} {self.tenant_id} {self.date_from}->{self.date_to} until {self.expires_at}"
+
+    @staticmethod
+    def active_overlapping(start, end):
+        """ unexpired holds sharing at least one day with [start, end] """
+        return BookingHold.objects.filter(expires_at__gt=timezone.now(), date_from__lte=end, date_to__gte=start)
+
+
+class BookingArchive(models.Model):
+    """Bookings that ended more than BOOKING_ARCHIVE_AFTER_DAYS ago, moved out of Booking.
+
+    Same columns and ids as Booking; `expire_bookings` moves them. Only read
+    where history matters (review eligibility, past months of the calendar)."""
+    id = models.BigIntegerField(primary_key=True)
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name="archived_bookings",
+                                db_index=False)
+    tenant = models.ForeignKey(User, on_delete=models.PROTECT, related_name="archived_bookings",
+                               db_index=False)
+    landlord = models.ForeignKey(User, on_delete=models.PROTECT, related_name="archived_incoming_bookings",
+                                 db_index=False)
+    date_from = models.DateField()
+    date_to = models.DateField()
+    status = models.CharField(max_length=16, choices=Booking.STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["listing","tenant","status"], name="booking_archive_stay_idx"),
+            models.Index(fields=["tenant"], name="booking_archive_tenant_idx"),
+            models.Index(fields=["landlord"], name="booking_archive_landlord_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.listing_id} {self.tenant_id} {self.date_from}->{self.date_to} [{self.status}, archived]"
 
 
 class Review(models.Model):
@@ -97,6 +279,9 @@ class Review(models.Model):
         constraints = [
             models.UniqueConstraint(fields=["listing", "author"], name="review_once_per_user"),
         ]
+        indexes = [
+            models.Index(fields=["listing", "created_at", "id"], name="review_listing_created_idx"),
+        ]
 
     def __str__(self):
         return f"*{self.rating} on {self.listing_id} by {self.author_id}"
@@ -0,0 +1,73 @@
+"""Price and availability of a stay, and tentative holds on its dates.
+
+A quote is one query on the listing row: its price plus EXISTS probes for
+an overlapping approved booking (the exclusion constraint's GiST index) and
+an unexpired hold of another tenant (booking_hold_listing_idx)."""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .models import Booking, BookingHold, Listing
+
+
+def quote_queryset(listing_id, date_from, date_to, user=None):
+    """The active listing with `booked` and `held` (by someone other than user) flags."""
+    holds = BookingHold.active_overlapping(date_from, date_to).filter(listing=OuterRef("pk"))
+    if user is not None and user.is_authenticated:
+        holds = holds.exclude(tenant=user)
+    return (Listing.objects.filter(pk=listing_id, is_active=True)
+            .annotate(booked=Exists(Booking.approved_overlapping(date_from, date_to).filter(listing=OuterRef("pk"))),
+                      held=Exists(holds))
+            .values("id", "owner_id", "price_per_day", "booked", "held"))
+
+
+def make_quote(row, date_from, date_to):
+    """ response body for a `quote_queryset` row """
+    days = (date_to - date_from).days + 1
+    return {
+        "listing": row["id"],
+        "date_from": date_from,
+        "date_to": date_to,
+        "days": days,
+        "price_per_day": str(row["price_per_day"]),
+        "total": str(row["price_per_day"] * days),
+        "available": not (row["booked"] or row["held"]),
+    }
+
+
+def place_hold(listing_id, date_from, date_to, user):
+    """Quote the stay and, when it is available, hold it for BOOKING_HOLD_TTL seconds.
+
+    The listing row is locked while checking, so two tenants cannot hold
+    overlapping dates. Expired holds of the listing are deleted here.
+
+    Returns:
+        the quote with "hold": {"id", "expires_at"} (or None if unavailable),
+        None when the listing does not exist or is inactive
+
+    Raises:
+        ValidationError for the listing's owner"""
+    with transaction.atomic():
+        if not Listing.objects.select_for_update().filter(pk=listing_id).exists():
+            return None
+        BookingHold.objects.filter(listing_id=listing_id, expires_at__lte=timezone.now()).delete()
+        row = quote_queryset(listing_id, date_from, date_to, user).first()
+        if row is None:
+            return None
+        if row["owner_id"] == user.id:
+            raise ValidationError({"detail": "Owner cannot book own listing."})
+        quote = make_quote(row, date_from, date_to)
+        quote["hold"] = None
+        if quote["available"]:
+            # a new hold replaces the tenant's earlier ones on this listing
+            BookingHold.objects.filter(listing_id=listing_id, tenant=user).delete()
+            hold = BookingHold.objects.create(
+                listing_id=listing_id, tenant=user, date_from=date_from, date_to=date_to,
+                expires_at=timezone.now() + timedelta(seconds=settings.BOOKING_HOLD_TTL),
+            )
+            quote["hold"] = {"id": hold.id, "expires_at": hold.expires_at}
+    return quote
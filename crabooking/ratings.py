@@ -0,0 +1,68 @@
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Q, Sum
+from django.db.models.functions import Cast, Now
+from django.utils import timezone
+
+from .caching import listing_cache
+from .models import Listing, Review
+
+RATING_FIELDS = ["rating_avg", "rating_count", "rating_sum"] + [f"rating_{stars}_count" for stars in range(1, 6)]
+
+
+def add_rating(listing_id, rating):
+    """Fold one new review into the listing aggregates with a single UPDATE.
+
+    Call inside the transaction that inserts the review. All right-hand sides
+    see the pre-update row, so the average is exact (no drift from rounding).
+    The listing cache is dropped once that transaction commits."""
+    Listing.objects.filter(pk=listing_id).update(
+        rating_count=F("rating_count") + 1,
+        rating_sum=F("rating_sum") + rating,
+        rating_avg=Cast(F("rating_sum") + rating, DecimalField(max_digits=12, decimal_places=2))
+        / (F("rating_count") + 1),
+        updated_at=Now(),
+        **{f"rating_{rating}_count": F(f"rating_{rating}_count") + 1},
+    )
+    transaction.on_commit(listing_cache.invalidate)
+
+
+def recompute_ratings(batch_size=1000):
+    """Rebuild aggregates of all listings from Review, one grouped query per batch.
+
+    Returns:
+        number of listings processed"""
+    last_id = 0
+    total = 0
+    while True:
+        ids = list(
+            Listing.objects.filter(pk__gt=last_id).order_by("pk").values_list("pk", flat=True)[:batch_size]
+        )
+        if not ids:
+            listing_cache.invalidate()
+            return total
+        stats = {
+            row["listing_id"]: row
+            for row in Review.objects.filter(listing_id__in=ids)
+            .order_by()
+            .values("listing_id")
+            .annotate(
+                n=Count("id"),
+                total=Sum("rating"),
+                **{f"stars_{stars}": Count("id", filter=Q(rating=stars)) for stars in range(1, 6)},
+            )
+        }
+        listings = []
+        now = timezone.now()
+        for pk in ids:
+            row = stats.get(pk)
+            listing = Listing(pk=pk, rating_count=0, rating_sum=0, rating_avg=0, updated_at=now)
+            for stars in range(1, 6):
+                setattr(listing, f"rating_{stars}_count", row[f"stars_{stars}"] if row else 0)
+            if row:
+                listing.rating_count = row["n"]
+                listing.rating_sum = row["total"]
+                listing.rating_avg = round(row["total"] / row["n"], 2)
+            listings.append(listing)
+        Listing.objects.bulk_update(listings, RATING_FIELDS + ["updated_at"])
+        total += len(ids)
+        last_id = ids[-1]
@@ -0,0 +1,23 @@
+from .models import Listing
+
+
+def refresh_search_vectors(queryset=None, batch_size=1000):
+    """Recompute `Listing.search_vector` for the queryset in pk batches.
+
+    Returns:
+        number of updated listings"""
+    if queryset is None:
+        queryset = Listing.objects.all()
+    vector = Listing.search_vector_expression()
+    last_id = 0
+    total = 0
+    while True:
+        ids = list(
+            queryset.filter(pk__gt=last_id)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not ids:
+            return total
+        total += Listing.objects.filter(pk__in=ids).update(search_vector=vector)
+        last_id = ids[-1]
@@ -1,7 +1,13 @@
 from datetime import timedelta
+from django.conf import settings
 from django.utils import timezone
 from rest_framework import serializers
-from .models import Listing, Booking, Review
+from django.db import transaction
+from django.db.models import Q
+from .models import Listing, Booking, BookingArchive, BookingHold, Review
+from .quotes import quote_queryset
+from .ratings import add_rating
+from .sparse import SparseFieldsSerializerMixin
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password as default_validate_password
 
@@ -40,19 +46,30 @@ class TrackFieldUpdatesMixin:
         return instance
 
 
-class ListingListSerializer(serializers.ModelSerializer):
+class ListingListSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    rating_histogram = serializers.ListField(child=serializers.IntegerField(), read_only=True)
+    # km, only present with ?near=
+    distance = serializers.FloatField(read_only=True)
+
     class Meta:
         model = Listing
         fields = ["id","owner","title","description","city","district",
                   "price_per_day","rooms","property_type","is_active",
+                  "latitude","longitude","distance",
+                  "rating_avg","rating_count","rating_histogram",
                   "created_at","updated_at"]
 
 class ListingCreateUpdateSerializer(TrackFieldUpdatesMixin, serializers.ModelSerializer):
     class Meta:
         model = Listing
         fields = ['id',"title","description","city","district","price_per_day",
-                  "rooms","property_type","is_active",'created_at','updated_at']
+                  "rooms","property_type","is_active","latitude","longitude",'created_at','updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
+    def validate(self, attrs):
+        coords = [attrs.get(name, getattr(self.instance, name, None)) for name in ("latitude", "longitude")]
+        if coords.count(None) == 1:
+            raise serializers.ValidationError("latitude and longitude must be set together.")
+        return attrs
 
 class BookingCreateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -66,16 +83,48 @@ class BookingCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Owner cannot book own listing.")
         if attrs["date_from"] > attrs["date_to"]:
             raise serializers.ValidationError("date_from must be <= date_to.")
+        # requests that could never be approved are refused up front
+        row = quote_queryset(listing.pk, attrs["date_from"], attrs["date_to"], user).first()
+        if row and row["booked"]:
+            raise serializers.ValidationError("Overlaps with existing approved booking.")
+        if row and row["held"]:
+            raise serializers.ValidationError("These dates are on hold for another tenant.")
         return attrs
     def create(self, validated):
         validated["tenant"] = self.context["request"].user
-        return super().create(validated)
+        with transaction.atomic():
+            booking = super().create(validated)
+            # the tenant's hold on these dates is used up; expired holds of the listing go too
+            BookingHold.objects.filter(
+                Q(tenant=booking.tenant, date_from__lte=booking.date_to, date_to__gte=booking.date_from)
+                | Q(expires_at__lte=timezone.now()),
+                listing=booking.listing,
+            ).delete()
+        return booking
+
+class BookingQuoteSerializer(serializers.Serializer):
+    listing = serializers.IntegerField()
+    date_from = serializers.DateField()
+    date_to = serializers.DateField()
+    hold = serializers.BooleanField(default=False)
+    def validate(self, attrs):
+        if attrs["date_from"] > attrs["date_to"]:
+            raise serializers.ValidationError("date_from must be <= date_to.")
+        return attrs
 
-class BookingDetailSerializer(serializers.ModelSerializer):
+class BookingDetailSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Booking
         fields = ["id","listing","tenant","date_from","date_to","status","created_at"]
 
+class BookingDecisionSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    decision = serializers.ChoiceField(choices=["approve", "reject"])
+
+class BookingBulkDecideSerializer(serializers.Serializer):
+    decisions = serializers.ListField(child=BookingDecisionSerializer(), allow_empty=False,
+                                      max_length=settings.BULK_DECIDE_MAX_ITEMS)
+
 class ReviewCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Review
@@ -90,17 +139,20 @@ class ReviewCreateSerializer(serializers.ModelSerializer):
         if Review.objects.filter(listing=listing, author=user).exists():
             raise serializers.ValidationError("You have already left a review for this listing.")
         today = timezone.now().date()
-        had_stay = Booking.objects.filter(
-            listing=listing, tenant=user, status=Booking.APPROVED, date_to__lte=today
-        ).exists()
+        stay = dict(listing=listing, tenant=user, status=Booking.APPROVED, date_to__lte=today)
+        # stays that ended long ago are in the archive
+        had_stay = Booking.objects.filter(**stay).exists() or BookingArchive.objects.filter(**stay).exists()
         if not had_stay:
             raise serializers.ValidationError("You can review only after a completed approved booking!")
         return attrs
     def create(self, validated):
         validated["author"] = self.context["request"].user
-        return super().create(validated)
+        with transaction.atomic():
+            review = super().create(validated)
+            add_rating(review.listing_id, review.rating)
+        return review
 
-class ReviewListSerializer(serializers.ModelSerializer):
+class ReviewListSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Review
         fields = ["id","author","rating","text","created_at"]
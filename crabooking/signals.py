@@ -1,9 +1,12 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch import receiver
 from crabooking.mails import send_landlord_invite_email
-from .models import Profile
+from crabooking.locations import adjust_location
+from crabooking.caching import listing_cache
+from .models import Profile, Listing
 
 
 
@@ -20,4 +23,51 @@ def create_profile_and_default_role(sender, instance, created, **kwargs):
     except Exception:
         pass
 
-    send_landlord_invite_email(instance)
\ No newline at end of file
+    send_landlord_invite_email(instance)
+
+
+@receiver(post_save, sender=Listing)
+def update_listing_search_vector(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and not {"title", "description"} & set(update_fields):
+        return
+    Listing.objects.filter(pk=instance.pk).update(search_vector=Listing.search_vector_expression())
+
+
+
+LOCATION_FIELDS = {"city", "district", "is_active"}
+
+@receiver(pre_save, sender=Listing)
+def remember_listing_location(sender, instance, update_fields=None, **kwargs):
+    if instance.pk is None:
+        return
+    if update_fields is not None and not LOCATION_FIELDS & set(update_fields):
+        return
+    instance._old_location = (
+        Listing.objects.filter(pk=instance.pk).values_list("city", "district", "is_active").first()
+    )
+
+
+@receiver(post_save, sender=Listing)
+def update_location_counts(sender, instance, created, **kwargs):
+    if not created and not hasattr(instance, "_old_location"):
+        return
+    old = instance.__dict__.pop("_old_location", None)
+    new = (instance.city, instance.district, instance.is_active)
+    if old == new:
+        return
+    if old and old[2]:
+        adjust_location(old[0], old[1], -1)
+    if new[2]:
+        adjust_location(new[0], new[1], 1)
+
+
+@receiver(post_delete, sender=Listing)
+def release_listing_location(sender, instance, **kwargs):
+    if instance.is_active:
+        adjust_location(instance.city, instance.district, -1)
+
+
+@receiver(post_save, sender=Listing)
+@receiver(post_delete, sender=Listing)
+def invalidate_listing_cache(sender, **kwargs):
+    transaction.on_commit(listing_cache.invalidate)
@@ -0,0 +1,77 @@
+"""`?fields=` / `?omit=` sparse fieldsets for read endpoints.
+
+The serializer mixin drops unrequested fields; the view mixin defers their
+columns so they are not fetched either. The fast `.values()` path needs
+nothing extra, it only selects what the trimmed serializer reads."""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ValidationError
+
+FIELDS_PARAM = "fields"
+OMIT_PARAM = "omit"
+
+
+def _names(request, param):
+    value = request.query_params.get(param, "")
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def requested_fields(request, available):
+    """Field names to keep, or None when the request does not ask for a subset."""
+    fields, omit = _names(request, FIELDS_PARAM), _names(request, OMIT_PARAM)
+    if not fields and not omit:
+        return None
+    for param, names in ((FIELDS_PARAM, fields), (OMIT_PARAM, omit)):
+        unknown = [name for name in names if name not in available]
+        if unknown:
+            raise ValidationError({param: f"unknown field(s): {', '.join(unknown)}"})
+    keep = set(fields) if fields else set(available)
+    return keep - set(omit)
+
+
+class SparseFieldsSerializerMixin:
+    """Serializer mixin: keep only the fields selected by the request's ?fields= / ?omit= on reads."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = (self.context or {}).get("request")
+        if request is None or request.method not in ("GET", "HEAD"):
+            return
+        keep = requested_fields(request, self.fields)
+        if keep is None:
+            return
+        for name in [name for name in self.fields if name not in keep]:
+            self.fields.pop(name)
+
+
+class SparseFieldsViewMixin:
+    """View mixin: defer the model columns of fields left out by ?fields= / ?omit=.
+
+    Only plain columns are deferred, never relations, ordering columns or
+    sources of computed fields, so no row is lazily reloaded while
+    serializing."""
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method not in ("GET", "HEAD"):
+            return queryset
+        serializer_class = self.get_serializer_class()
+        all_fields = serializer_class(context={}).fields
+        keep = requested_fields(self.request, all_fields)
+        if keep is None:
+            return queryset
+
+        keep_sources = {all_fields[name].source for name in keep}
+        ordering = [term.lstrip("-") for term in queryset.query.order_by if isinstance(term, str)]
+        if hasattr(self.paginator, "get_ordering_columns"):
+            ordering += self.paginator.get_ordering_columns(self.request, queryset, self)
+        deferred = []
+        for name, field in all_fields.items():
+            if name in keep or field.source in keep_sources or field.source in ordering:
+                continue
+            try:
+                model_field = queryset.model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                continue
+            if model_field.concrete and not model_field.is_relation and not model_field.primary_key:
+                deferred.append(model_field.name)
+        return queryset.defer(*deferred) if deferred else queryset
@@ -1,3 +1,90 @@
-from django.test import TestCase
+import json
+from datetime import date
+from decimal import Decimal
 
-# Create your tests here.
+from django.test import RequestFactory, SimpleTestCase
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor
+from rest_framework.request import Request
+
+from final04ka.paginations import CustomCursorPagination
+
+from .decisions import sweep
+from .models import Listing
+
+
+def day(n):
+    return date(2030, 1, n)
+
+
+class SweepTests(SimpleTestCase):
+    def test_no_conflicts(self):
+        candidates = [(day(1), day(2), 10, 0), (day(5), day(6), 11, 1)]
+        self.assertEqual(sweep([], candidates), [10, 11])
+
+    def test_bounds_are_inclusive(self):
+        approved = [(day(3), day(4))]
+        candidates = [(day(1), day(3), 10, 0), (day(4), day(6), 11, 1), (day(5), day(6), 12, 2)]
+        self.assertEqual(sweep(approved, candidates), [12])
+
+    def test_approved_stay_spanning_several_candidates(self):
+        approved = [(day(2), day(20)), (day(5), day(6))]
+        candidates = [(day(8), day(9), 10, 0), (day(15), day(16), 11, 1), (day(21), day(22), 12, 2)]
+        self.assertEqual(sweep(approved, candidates), [12])
+
+    def test_earlier_stay_wins_within_batch(self):
+        candidates = [(day(3), day(5), 10, 0), (day(1), day(3), 11, 1), (day(6), day(7), 12, 2)]
+        self.assertEqual(sweep([], candidates), [11, 12])
+
+    def test_same_start_goes_to_earlier_in_request(self):
+        candidates = [(day(1), day(2), 10, 1), (day(1), day(4), 11, 0)]
+        self.assertEqual(sweep([], candidates), [11])
+
+    def test_rejected_candidate_does_not_block(self):
+        approved = [(day(1), day(10))]
+        candidates = [(day(5), day(12), 10, 0), (day(11), day(12), 11, 1)]
+        self.assertEqual(sweep(approved, candidates), [11])
+
+
+class CursorPaginationTests(SimpleTestCase):
+    def setUp(self):
+        self.paginator = CustomCursorPagination()
+        self.paginator.ordering = ("price_per_day", "id")
+        self.queryset = Listing.objects.all()
+
+    def request(self, **params):
+        return Request(RequestFactory().get("/listings/", params))
+
+    def test_position_round_trip(self):
+        row = {"price_per_day": Decimal("12.50"), "id": 7}
+        position = self.paginator._get_position_from_instance(row, ("-price_per_day", "id"))
+        self.assertEqual(json.loads(position), ["12.50", "7"])
+        values = self.paginator._decode_position(self.queryset, ["price_per_day", "id"], position)
+        self.assertEqual(values, [Decimal("12.50"), 7])
+
+    def test_cursor_round_trip(self):
+        self.paginator.base_url = "http://testserver/listings/"
+        url = self.paginator.encode_cursor(Cursor(offset=0, reverse=True, position='["10","3"]'))
+        cursor = url.split("cursor=")[1]
+        self.assertEqual(self.paginator.decode_cursor(self.request(cursor=cursor)),
+                         Cursor(offset=0, reverse=True, position='["10","3"]'))
+
+    def test_invalid_position(self):
+        for position in ("not json", '["10"]', '{"id": 1}', '["x","3"]'):
+            with self.subTest(position=position), self.assertRaises(NotFound):
+                self.paginator._decode_position(self.queryset, ["price_per_day", "id"], position)
+
+    def test_after_position(self):
+        condition = self.paginator._after_position(self.queryset, '["10","3"]', False)
+        sql = str(self.queryset.filter(condition).query)
+        self.assertIn('"price_per_day" >= 10', sql)
+        self.assertIn('"price_per_day" > 10', sql)
+        self.assertIn('"id" > 3', sql)
+
+    def test_after_position_reversed_mixed_directions(self):
+        self.paginator.ordering = ("-price_per_day", "id")
+        condition = self.paginator._after_position(self.queryset, '["10","3"]', True)
+        sql = str(self.queryset.filter(condition).query)
+        self.assertIn('"price_per_day" >= 10', sql)
+        self.assertIn('"price_per_day" > 10', sql)
+        self.assertIn('"id" < 3', sql)
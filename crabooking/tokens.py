@@ -0,0 +1,32 @@
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken as BaseRefreshToken
+
+from .blacklist import jti_blacklist
+
+
+def refresh_result_key(jti):
+    """ cache key of a coalesced refresh result (see JWTAuthenticationMiddleware) """
+    return f'jwt-refresh:{jti}:result'
+
+
+class RefreshToken(BaseRefreshToken):
+    """Refresh token checking the blacklist through the in-memory JTI filter.
+
+    simplejwt runs `BlacklistedToken.objects.filter(token__jti=...).exists()`
+    on every construction; here only bloom filter hits reach the DB."""
+
+    def check_blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        if jti in jti_blacklist:
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        result = super().blacklist()
+        jti = self.payload[api_settings.JTI_CLAIM]
+        jti_blacklist.add(jti)
+        # a refresh result shared under this token must not outlive it (logout)
+        cache.delete(refresh_result_key(jti))
+        return result
@@ -0,0 +1,54 @@
+"""Booking status changes as single compare-and-set statements.
+
+Each `Booking.TRANSITIONS` action is one `UPDATE ... WHERE id AND status AND
+actor RETURNING`, so two workers deciding the same booking cannot both
+succeed and no row is read before writing. Only when nothing was updated is
+the booking read, to tell the caller why."""
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
+
+from .availability import invalidate_calendar
+from .models import Booking
+
+OVERLAP_MESSAGE = "Overlaps with existing approved booking"
+
+
+def apply_transition(booking_id, action, user):
+    """Perform a `Booking.TRANSITIONS` action for user and return the new status.
+
+    Raises:
+        NotFound, PermissionDenied, or ValidationError when the booking is
+        not in a state the action applies to or would overlap an approved stay"""
+    transition = Booking.TRANSITIONS[action]
+    statuses = ", ".join(["%s"] * len(transition["from"]))
+    sql = f"""
+        UPDATE {connection.ops.quote_name(Booking._meta.db_table)} SET status = %s
+        WHERE id = %s AND status IN ({statuses}) AND {transition["actor"]}_id = %s
+          AND (status <> %s OR date_from > %s)
+        RETURNING listing_id
+    """
+    params = [transition["to"], booking_id, *transition["from"], user.id,
+              Booking.APPROVED, timezone.now().date()]
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+    except IntegrityError:
+        raise ValidationError({"detail": OVERLAP_MESSAGE})
+    if row is None:
+        raise _failure(booking_id, action, user)
+
+    if Booking.APPROVED in (transition["to"], *transition["from"]):
+        invalidate_calendar(row[0])
+    return transition["to"]
+
+
+def _failure(booking_id, action, user):
+    actor = f'{Booking.TRANSITIONS[action]["actor"]}_id'
+    actor_id = Booking.objects.filter(pk=booking_id).values_list(actor, flat=True).first()
+    if actor_id is None:
+        return NotFound()
+    if actor_id != user.id:
+        return PermissionDenied("Not allowed")
+    return ValidationError({"detail": f"Cannot {action} now"})
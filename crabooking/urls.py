@@ -1,9 +1,11 @@
 from django.urls import path
 from .views import (
     ListingListCreateView, ListingDetailUpdateDeleteView,
-    ListingReviewsListCreateView,
-    BookingCreateView, BookingMineListView, BookingDetailView,
-    BookingApproveView, BookingRejectView, BookingCancelView,
+    ListingReviewsListCreateView, LocationAutocompleteView, ListingBulkView,
+    ListingFacetsView,
+    ListingCalendarView,
+    BookingCreateView, BookingMineListView, BookingIncomingListView, BookingDetailView,
+    BookingApproveView, BookingBulkDecideView, BookingQuoteView, BookingRejectView, BookingCancelView,
     LoginView,
     RegistrationView,
     LogoutView,
@@ -34,11 +36,18 @@ urlpatterns = [
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
 
     path("listings/", ListingListCreateView.as_view(), name='bookings'),
+    path("listings/bulk/", ListingBulkView.as_view(), name='listing-bulk'),
+    path("listings/facets/", ListingFacetsView.as_view(), name='listing-facets'),
+    path("listings/locations/", LocationAutocompleteView.as_view(), name='listing-locations'),
     path("listings/<int:pk>/", ListingDetailUpdateDeleteView.as_view(), name='booking-detail'),
+    path("listings/<int:pk>/calendar/", ListingCalendarView.as_view(), name='listing-calendar'),
     path("listings/<int:pk>/reviews/", ListingReviewsListCreateView.as_view(), name='bookings'),
 
     path("bookings/", BookingCreateView.as_view(), name='bookings'),
     path("bookings/mine/", BookingMineListView.as_view(), name='users-bookings'),
+    path("bookings/incoming/", BookingIncomingListView.as_view(), name='incoming-bookings'),
+    path("bookings/quote/", BookingQuoteView.as_view(), name='booking-quote'),
+    path("bookings/bulk-decide/", BookingBulkDecideView.as_view(), name='booking-bulk-decide'),
     path("bookings/<int:pk>/", BookingDetailView.as_view(), name='booking-detail'),
     path("bookings/<int:pk>/approve/", BookingApproveView.as_view(), name='booking-approve'),
     path("bookings/<int:pk>/reject/", BookingRejectView.as_view(), name='booking-reject'),
@@ -1,25 +1,42 @@
 # Create your views here.
+from datetime import date
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError
+from django.http import StreamingHttpResponse
 from django.utils import timezone
-from rest_framework import generics, permissions, filters
+from rest_framework import generics, permissions
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import Listing, Booking, Review, Profile
-from .filters import ListingFilter
+from .filters import IncomingBookingFilter, ListingFilter, ListingSearchFilter, AnnotationOrderingFilter
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import Group, User
-from rest_framework_simplejwt.tokens import RefreshToken
+from .tokens import RefreshToken
 from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework.exceptions import ValidationError
 from django.conf import settings
 import secrets
 from .serializers import (
     ListingListSerializer, ListingCreateUpdateSerializer,
-    BookingCreateSerializer, BookingDetailSerializer,
+    BookingCreateSerializer, BookingDetailSerializer, BookingBulkDecideSerializer, BookingQuoteSerializer,
     ReviewCreateSerializer, ReviewListSerializer,
     UserRegisterSerializer,
 )
 from .permissions import IsOwnerOrReadOnly, IsLandlord, IsBookingActorOrListingOwner
+from .async_views import AsyncReadMixin
+from .sparse import SparseFieldsViewMixin
+from .locations import asuggest, suggest
+from .caching import listing_cache, request_cache_key
+from .facets import facet_counts
+from .decisions import bulk_decide
+from .quotes import make_quote, place_hold, quote_queryset
+from .availability import aget_bitmap, compute_bitmap, month_days
+from .transitions import OVERLAP_MESSAGE, apply_transition
+from .bulk import FORMATS, aexport_chunks, export_lines, import_listings
+from .fast_serializers import FastBookingDetailSerializer, FastListingListSerializer, FastReviewListSerializer
+from .conditional import acollection_validators, make_etag, not_modified, page_etag, set_validators
 
 # Auth's
 def set_jwt_cookies(response, user):
@@ -173,12 +190,31 @@ class PromoteLandlordSelfView(APIView):
 
 
 # Listings
-class ListingListCreateView(generics.ListCreateAPIView):
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter, DjangoFilterBackend]
+class ListingListCreateView(AsyncReadMixin, SparseFieldsViewMixin, generics.ListCreateAPIView):
+    # ordering last, so annotations from filters (rank, distance) are available
+    filter_backends = [ListingSearchFilter, DjangoFilterBackend, AnnotationOrderingFilter]
     filterset_class = ListingFilter
-    search_fields = ["title","description"]
-    ordering_fields = ["price_per_day","created_at"]
+    ordering_fields = ["price_per_day","created_at","rating_avg","rating_count","rank","distance"]
     ordering = ["-created_at"]
+    fast_serializer_class = FastListingListSerializer
+
+    async def aget(self, request, *args, **kwargs):
+        # page data is the same for every user, cache it per normalized query
+        # together with its validators; every listing write bumps the cache
+        # version, so its time is a safe Last-Modified
+        query = request_cache_key(request)
+        key = await listing_cache.akey("page", query)
+        entry = await listing_cache.aget(key)
+        if entry is not None:
+            return (not_modified(request, entry["etag"], entry["last_modified"])
+                    or set_validators(Response(entry["data"]), entry["etag"], entry["last_modified"]))
+
+        response = await self.alist(request, *args, **kwargs)
+        if response.status_code != 200:
+            return response
+        etag, last_modified = page_etag(response.data, query), await listing_cache.achanged_at()
+        await listing_cache.aset(key, {"data": response.data, "etag": etag, "last_modified": last_modified})
+        return not_modified(request, etag, last_modified) or set_validators(response, etag, last_modified)
 
     def get_queryset(self):
         qs = Listing.objects.all().select_related("owner")
@@ -197,14 +233,161 @@ class ListingListCreateView(generics.ListCreateAPIView):
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
 
-class ListingDetailUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
+class ListingBulkView(AsyncReadMixin, generics.GenericAPIView):
+    """Bulk listings as NDJSON (default) or CSV (`?as=csv`).
+
+    GET streams the (filtered) catalog ordered by id, POST imports the request
+    body as the user's listings and reports per-line errors. Neither side holds
+    more than one batch in memory."""
+    serializer_class = ListingCreateUpdateSerializer
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = ListingFilter
+    pagination_class = None
+
+    def get_queryset(self):
+        qs = Listing.objects.all()
+        if self.request.query_params.get("is_active") is None:
+            qs = qs.filter(is_active=True)
+        return qs
+
+    def get_permissions(self):
+        if self.request.method == "POST":
+            return [permissions.IsAuthenticated(), IsLandlord()]
+        return [permissions.AllowAny()]
+
+    def get_format(self):
+        fmt = self.request.query_params.get("as", "ndjson")
+        if fmt not in FORMATS:
+            raise ValidationError({"as": f"one of {', '.join(FORMATS)}"})
+        return fmt
+
+    def _streaming_response(self, fmt, lines):
+        response = StreamingHttpResponse(lines, content_type=FORMATS[fmt])
+        response["Content-Disposition"] = f'attachment; filename="listings.{fmt}"'
+        return response
+
+    async def aget(self, request, *args, **kwargs):
+        fmt = self.get_format()
+        return self._streaming_response(fmt, aexport_chunks(fmt, self.filter_queryset(self.get_queryset())))
+
+    def get(self, request, *args, **kwargs):
+        fmt = self.get_format()
+        return self._streaming_response(fmt, export_lines(fmt, self.filter_queryset(self.get_queryset())))
+
+    def post(self, request, *args, **kwargs):
+        # iterate the raw body by lines instead of parsing request.data
+        result = import_listings(request._request, self.get_format(), request.user)
+        return Response(result, status=status.HTTP_201_CREATED if result["created"] else status.HTTP_400_BAD_REQUEST)
+
+class ListingFacetsView(AsyncReadMixin, generics.GenericAPIView):
+    """Facet counts (city, property type, rooms, price bucket) for the `ListingFilter` params.
+
+    Computed in one grouped query and cached per normalized query until the
+    next listing write."""
+    serializer_class = ListingListSerializer
+    filter_backends = [ListingSearchFilter, DjangoFilterBackend]
+    filterset_class = ListingFilter
+    pagination_class = None
+    permission_classes = [permissions.AllowAny]
+
+    def get_queryset(self):
+        qs = Listing.objects.all()
+        if self.request.query_params.get("is_active") is None:
+            qs = qs.filter(is_active=True)
+        return qs
+
+    async def aget(self, request, *args, **kwargs):
+        key = await listing_cache.akey("facets", request_cache_key(request))
+        data = await listing_cache.aget(key)
+        if data is None:
+            data = await sync_to_async(facet_counts)(self.filter_queryset(self.get_queryset()))
+            await listing_cache.aset(key, data)
+        return Response(data)
+
+    def get(self, request, *args, **kwargs):
+        return Response(facet_counts(self.filter_queryset(self.get_queryset())))
+
+class LocationAutocompleteView(AsyncReadMixin, APIView):
+    """`?q=` city/district suggestions with active listing counts.
+
+    Served from the Location dictionary (trigram index), cached per prefix."""
+    permission_classes = [permissions.AllowAny]
+    max_limit = 20
+
+    def get_params(self, request):
+        """ (q, limit) from the query string """
+        q = request.query_params.get("q", "").strip()
+        if not q:
+            raise ValidationError({"detail": "q is required"})
+        try:
+            limit = min(int(request.query_params.get("limit", 10)), self.max_limit)
+        except ValueError:
+            raise ValidationError({"detail": "limit must be an integer"})
+        return q[:80], max(limit, 1)
+
+    async def aget(self, request, *args, **kwargs):
+        return Response({"results": await asuggest(*self.get_params(request))})
+
+    def get(self, request, *args, **kwargs):
+        return Response({"results": suggest(*self.get_params(request))})
+
+class ListingDetailUpdateDeleteView(SparseFieldsViewMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Listing.objects.all()
     permission_classes = [IsOwnerOrReadOnly]
+
+    def retrieve(self, request, *args, **kwargs):
+        # validators from updated_at alone, a 304 skips loading the row
+        updated_at = (self.get_queryset().filter(pk=kwargs["pk"])
+                      .values_list("updated_at", flat=True).first())
+        if updated_at is None:
+            return super().retrieve(request, *args, **kwargs)
+        # the query string selects fields (?fields=/?omit=), part of the representation
+        etag = make_etag(request_cache_key(request), request.accepted_renderer.format, updated_at)
+        response = not_modified(request, etag, updated_at)
+        if response is not None:
+            return response
+        return set_validators(super().retrieve(request, *args, **kwargs), etag, updated_at)
+
     def get_serializer_class(self):
         return ListingCreateUpdateSerializer if self.request.method in ["PUT","PATCH"] else ListingListSerializer
 
+class ListingCalendarView(AsyncReadMixin, APIView):
+    """`?month=YYYY-MM` (default: current month) booked and free days of a listing.
+
+    Served from a cached per-month bitmap of its approved bookings."""
+    permission_classes = [permissions.AllowAny]
+
+    def get_month(self, request):
+        """ (year, month) from the query string """
+        month = request.query_params.get("month") or timezone.localdate().strftime("%Y-%m")
+        try:
+            year, month = (int(part) for part in month.split("-"))
+            date(year, month, 1)
+        except ValueError:
+            raise ValidationError({"detail": "month must be YYYY-MM"})
+        return year, month
+
+    async def aget(self, request, pk, *args, **kwargs):
+        year, month = self.get_month(request)
+        if not await Listing.objects.filter(pk=pk).aexists():
+            return Response({"detail": "Not found."}, status=404)
+        return Response(self.calendar(pk, year, month, await aget_bitmap(pk, year, month)))
+
+    def get(self, request, pk, *args, **kwargs):
+        year, month = self.get_month(request)
+        if not Listing.objects.filter(pk=pk).exists():
+            return Response({"detail": "Not found."}, status=404)
+        return Response(self.calendar(pk, year, month, compute_bitmap(pk, year, month)))
+
+    @staticmethod
+    def calendar(pk, year, month, bitmap):
+        return {"listing": pk, "month": f"{year:04d}-{month:02d}", **month_days(bitmap, year, month)}
+
 # Reviews
-class ListingReviewsListCreateView(generics.ListCreateAPIView):
+class ListingReviewsListCreateView(AsyncReadMixin, SparseFieldsViewMixin, generics.ListCreateAPIView):
+    ordering = ["-created_at"]
+    fast_serializer_class = FastReviewListSerializer
+
     def get_queryset(self):
         if getattr(self, 'swagger_fake_view', False):
             return Review.objects.none()
@@ -217,54 +400,117 @@ class ListingReviewsListCreateView(generics.ListCreateAPIView):
     def perform_create(self, serializer):
         serializer.save()
 
+    async def aget(self, request, *args, **kwargs):
+        # reviews are never edited, newest created_at and the count identify the list
+        etag, last_modified = await acollection_validators(
+            self.get_queryset(), "created_at", request_cache_key(request))
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        return set_validators(await self.alist(request, *args, **kwargs), etag, last_modified)
+
 # Bookings
 class BookingCreateView(generics.CreateAPIView):
     serializer_class = BookingCreateSerializer
     permission_classes = [permissions.IsAuthenticated]
     queryset = Booking.objects.all()
 
-class BookingMineListView(generics.ListAPIView):
+class BookingQuoteView(AsyncReadMixin, APIView):
+    """Total price and availability of `listing` for `date_from`..`date_to` (inclusive).
+
+    GET quotes from query params; POST with `"hold": true` also holds the
+    dates for BOOKING_HOLD_TTL seconds if they are available."""
+
+    def get_permissions(self):
+        if self.request.method == "POST":
+            return [permissions.IsAuthenticated()]
+        return [permissions.AllowAny()]
+
+    async def aget(self, request, *args, **kwargs):
+        serializer = BookingQuoteSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        row = await quote_queryset(data["listing"], data["date_from"], data["date_to"], request.user).afirst()
+        if row is None:
+            return Response({"detail": "Not found."}, status=404)
+        return Response(make_quote(row, data["date_from"], data["date_to"]))
+
+    def get(self, request, *args, **kwargs):
+        serializer = BookingQuoteSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        row = quote_queryset(data["listing"], data["date_from"], data["date_to"], request.user).first()
+        if row is None:
+            return Response({"detail": "Not found."}, status=404)
+        return Response(make_quote(row, data["date_from"], data["date_to"]))
+
+    def post(self, request, *args, **kwargs):
+        serializer = BookingQuoteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        if data["hold"]:
+            quote = place_hold(data["listing"], data["date_from"], data["date_to"], request.user)
+        else:
+            row = quote_queryset(data["listing"], data["date_from"], data["date_to"], request.user).first()
+            quote = row and make_quote(row, data["date_from"], data["date_to"])
+        if quote is None:
+            return Response({"detail": "Not found."}, status=404)
+        return Response(quote)
+
+class BookingMineListView(AsyncReadMixin, SparseFieldsViewMixin, generics.ListAPIView):
+    serializer_class = BookingDetailSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    ordering = ["-created_at"]
+    fast_serializer_class = FastBookingDetailSerializer
+    def get_queryset(self):
+        # (tenant, created_at, id) index range scan, the serializer needs no listing columns
+        return Booking.objects.filter(tenant=self.request.user)
+
+class BookingIncomingListView(AsyncReadMixin, SparseFieldsViewMixin, generics.ListAPIView):
+    """Bookings of the user's listings, newest first; `?status=` and `?listing=` filters."""
     serializer_class = BookingDetailSerializer
     permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = IncomingBookingFilter
+    ordering = ["-created_at"]
+    fast_serializer_class = FastBookingDetailSerializer
     def get_queryset(self):
-        return Booking.objects.filter(tenant=self.request.user).select_related("listing")
+        # the denormalized landlord avoids a join with listings, pages are
+        # ranges of booking_landlord_created_idx / booking_landlord_status_idx
+        return Booking.objects.filter(landlord=self.request.user)
 
 class BookingDetailView(generics.RetrieveAPIView):
     serializer_class = BookingDetailSerializer
     permission_classes = [permissions.IsAuthenticated, IsBookingActorOrListingOwner]
     queryset = Booking.objects.select_related("listing")
 
-class BookingApproveView(APIView):
-    permission_classes = [permissions.IsAuthenticated]
-    def post(self, request, pk):
-        b = Booking.objects.select_related("listing").get(pk=pk)
-        if b.listing.owner_id != request.user.id:
-            return Response({"detail":"Not allowed"}, status=403)
-        if Booking.overlaps_approved(b.listing_id, b.date_from, b.date_to):
-            return Response({"detail":"Overlaps with existing approved booking"}, status=400)
-        b.status = Booking.APPROVED
-        b.save(update_fields=["status"])
-        return Response({"status": b.status})
-
-class BookingRejectView(APIView):
-    permission_classes = [permissions.IsAuthenticated]
-    def post(self, request, pk):
-        b = Booking.objects.select_related("listing").get(pk=pk)
-        if b.listing.owner_id != request.user.id:
-            return Response({"detail":"Not allowed"}, status=403)
-        b.status = Booking.REJECTED
-        b.save(update_fields=["status"])
-        return Response({"status": b.status})
-
-class BookingCancelView(APIView):
+class BookingTransitionView(APIView):
+    """POST performs `transition`, one of `Booking.TRANSITIONS`."""
     permission_classes = [permissions.IsAuthenticated]
+    transition = None
+
     def post(self, request, pk):
-        b = Booking.objects.get(pk=pk)
-        if b.tenant_id != request.user.id:
-            return Response({"detail":"Not allowed"}, status=403)
-        today = timezone.now().date()
-        if b.status == Booking.REQUESTED or (b.status == Booking.APPROVED and today < b.date_from):
-            b.status = Booking.CANCELLED
-            b.save(update_fields=["status"])
-            return Response({"status": b.status})
-        return Response({"detail":"Cannot cancel now"}, status=400)
+        return Response({"status": apply_transition(pk, self.transition, request.user)})
+
+class BookingApproveView(BookingTransitionView):
+    transition = "approve"
+
+class BookingRejectView(BookingTransitionView):
+    transition = "reject"
+
+class BookingCancelView(BookingTransitionView):
+    transition = "cancel"
+
+class BookingBulkDecideView(APIView):
+    """Approve/reject many requested bookings at once, with a result per item."""
+    permission_classes = [permissions.IsAuthenticated, IsLandlord]
+
+    def post(self, request):
+        serializer = BookingBulkDecideSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            results = bulk_decide(request.user, serializer.validated_data["decisions"])
+        except IntegrityError:
+            # a single approval committed an overlapping stay meanwhile
+            return Response({"detail":OVERLAP_MESSAGE}, status=400)
+        return Response({"results": results})
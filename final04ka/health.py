@@ -5,7 +5,7 @@ START_TS = time.time()
 INSTANCE_ID = secrets.token_hex(4)
 STARTED_AT = datetime.datetime.now(datetime.timezone.utc)
 
-def health(request):
+async def health(request):
     data = {
         "status": "I am up!",
         "instance_id": INSTANCE_ID,
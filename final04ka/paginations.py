@@ -1,5 +1,162 @@
-from rest_framework.pagination import CursorPagination
+import json
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, _reverse_ordering
 
 class CustomCursorPagination(CursorPagination):
-    page_size = 3
-    ordering = 'created_at'
+    """Keyset pagination on composite `(ordering..., id)` cursors, usable from sync and async views.
+
+    The ordering comes from the view's OrderingFilter, else from the view's
+    `ordering`, and always gets `id` appended as tie-breaker, so positions are
+    unique: a page is the next `page_size` rows strictly after the last
+    position, never an offset. The position test is the expanded row
+    comparison `a > x OR (a = x AND id > y)` plus the redundant bound
+    `a >= x`, which lets the matching composite index answer it with a range
+    scan. Ordering fields must not be nullable.
+
+    DRF's `paginate_queryset` is split in two: `_page_queryset` builds the
+    sliced queryset for the requested cursor and `_set_page` derives the page
+    and next/previous positions from the fetched rows. `apaginate_queryset`
+    fetches the rows with the async ORM in between."""
+    ordering = '-created_at'
+    page_size_query_param = 'page_size'
+    max_page_size = settings.MAX_PAGE_SIZE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self._page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self._set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        queryset = self._page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self._set_page([obj async for obj in queryset])
+
+    def get_ordering(self, request, queryset, view):
+        has_ordering_filter = any(hasattr(backend, 'get_ordering')
+                                  for backend in getattr(view, 'filter_backends', []))
+        if not has_ordering_filter and getattr(view, 'ordering', None):
+            ordering = view.ordering
+            ordering = (ordering,) if isinstance(ordering, str) else tuple(ordering)
+        else:
+            ordering = super().get_ordering(request, queryset, view)
+
+        if any(term.lstrip('-') in ('id', 'pk') for term in ordering):
+            return ordering
+        return (*ordering, '-id' if ordering[-1].startswith('-') else 'id')
+
+    def get_ordering_columns(self, request, queryset, view):
+        """ names page positions are read from, rows must carry them """
+        return [term.lstrip('-') for term in self.get_ordering(request, queryset, view)]
+
+    def _page_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        # Cursor pagination always enforces an ordering.
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        # If we have a cursor with a fixed position then filter by that.
+        if current_position is not None:
+            queryset = queryset.filter(self._after_position(queryset, current_position, reverse))
+
+        self._offset, self._reverse, self._current_position = offset, reverse, current_position
+        # one extra item tells whether there is a following page
+        return queryset[offset:offset + self.page_size + 1]
+
+    def _after_position(self, queryset, position, reverse):
+        """Condition for the rows strictly after `position` in the (possibly reversed) ordering."""
+        names = [term.lstrip('-') for term in self.ordering]
+        values = self._decode_position(queryset, names, position)
+        # (cursor reversed) XOR (field descending) means "less than"
+        less = [reverse != term.startswith('-') for term in self.ordering]
+
+        condition = Q()
+        for i, name in enumerate(names):
+            step = Q(**dict(zip(names[:i], values[:i])))
+            step &= Q(**{f'{name}__{"lt" if less[i] else "gt"}': values[i]})
+            condition |= step
+        # implied by the above; gives the planner an index range on the leading column
+        return Q(**{f'{names[0]}__{"lte" if less[0] else "gte"}': values[0]}) & condition
+
+    def _decode_position(self, queryset, names, position):
+        try:
+            raw = json.loads(position)
+            if not isinstance(raw, list) or len(raw) != len(names):
+                raise ValueError
+            return [self._ordering_field(queryset, name).to_python(value)
+                    for name, value in zip(names, raw)]
+        except (ValueError, TypeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def _ordering_field(queryset, name):
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        try:
+            return queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            raise NotFound(CustomCursorPagination.invalid_cursor_message)
+
+    def _get_position_from_instance(self, instance, ordering):
+        # str() keeps full precision (microseconds, decimals, float repr)
+        values = []
+        for term in ordering:
+            name = term.lstrip('-')
+            value = instance[name] if isinstance(instance, dict) else getattr(instance, name)
+            values.append(str(value))
+        return json.dumps(values, separators=(',', ':'))
+
+    def _set_page(self, results):
+        offset, reverse, current_position = self._offset, self._reverse, self._current_position
+        self.page = list(results[:self.page_size])
+
+        # Determine the position of the final item following the page.
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            # reverse queryset, flip the items back before returning them
+            self.page = list(reversed(self.page))
+
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
@@ -57,6 +57,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     'drf_yasg',
     'rest_framework',
     'rest_framework.authtoken',
@@ -68,7 +69,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    # WhiteNoise with an async path, so the ASGI chain has no sync middleware
+    "crabooking.middleware.AsyncWhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -107,6 +109,13 @@ DATABASES = {
 }
 DATABASES["default"]["CONN_MAX_AGE"] = env.int("DATABASE_CONN_MAX_AGE", default=60)
 
+# Cache
+# shared between gunicorn workers when CACHE_URL points to redis/memcached,
+# per-process locmem stand-in otherwise
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -187,8 +196,9 @@ else:
 # DRF settings
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'final04ka.paginations.CustomCursorPagination',
+    'PAGE_SIZE': env.int('PAGE_SIZE', default=20),
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'crabooking.authentication.CookieJWTAuthentication',
     ],
 
     'DEFAULT_PERMISSION_CLASSES': [
@@ -226,6 +236,68 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'user_id',
 }
 
+# paths served without any JWT work (probes, docs); STATIC_URL is added automatically
+JWT_AUTH_EXEMPT_PATHS = ['/health']
+JWT_AUTH_EXEMPT_PREFIXES = ['/swagger', '/redoc']
+
+# rotated CSRF token is returned in the X-CSRF-Token response header;
+# enable to also inject it into JSON bodies for older clients
+JWT_CSRF_IN_BODY = env.bool('JWT_CSRF_IN_BODY', default=False)
+
+# per-worker blacklisted JTI filter (crabooking.blacklist), refreshed from the
+# token_blacklist tables every SYNC_INTERVAL seconds
+JWT_BLACKLIST_SYNC_INTERVAL = env.float('JWT_BLACKLIST_SYNC_INTERVAL', default=5.0)
+JWT_BLACKLIST_REBUILD_INTERVAL = env.int('JWT_BLACKLIST_REBUILD_INTERVAL', default=3600)
+JWT_BLACKLIST_BLOOM_CAPACITY = env.int('JWT_BLACKLIST_BLOOM_CAPACITY', default=100_000)
+JWT_BLACKLIST_BLOOM_ERROR_RATE = 0.001
+JWT_BLACKLIST_RECENT_SIZE = 10_000
+# each sync re-reads this many ids below the last one seen: ids are assigned
+# at insert, so a row can commit after rows with higher ids
+JWT_BLACKLIST_SYNC_OVERLAP = env.int('JWT_BLACKLIST_SYNC_OVERLAP', default=1000)
+
+# single-flight refresh: concurrent requests with the same refresh token reuse
+# one rotation result (via CACHES['default']) for the coalesce window; blacklisting
+# the token (logout) drops the shared result
+TOKEN_REFRESH_SINGLE_FLIGHT = env.bool('TOKEN_REFRESH_SINGLE_FLIGHT', default=True)
+TOKEN_REFRESH_COALESCE_WINDOW = env.int('TOKEN_REFRESH_COALESCE_WINDOW', default=5)
+TOKEN_REFRESH_LOCK_WAIT = env.float('TOKEN_REFRESH_LOCK_WAIT', default=2.0)
+
+
+# text search configuration for Listing.search_vector ('simple' = no stemming,
+# listings are written in many languages)
+LISTING_SEARCH_CONFIG = env('LISTING_SEARCH_CONFIG', default='simple')
+
+# seconds a /listings/locations/ suggestion list stays cached per prefix
+LOCATION_SUGGEST_CACHE_TIMEOUT = env.int('LOCATION_SUGGEST_CACHE_TIMEOUT', default=300)
+
+# /listings/ response cache: per-process LRU in front of CACHES[LISTING_CACHE_ALIAS],
+# invalidated by listing writes; other workers notice within VERSION_TTL seconds
+LISTING_CACHE_ALIAS = env('LISTING_CACHE_ALIAS', default='default')
+LISTING_CACHE_TIMEOUT = env.int('LISTING_CACHE_TIMEOUT', default=60)
+LISTING_CACHE_LOCAL_SIZE = env.int('LISTING_CACHE_LOCAL_SIZE', default=512)
+LISTING_CACHE_VERSION_TTL = env.float('LISTING_CACHE_VERSION_TTL', default=1.0)
+# geo filters: max geohash cells per bbox/radius lookup, radius limits in km
+GEO_MAX_COVER_CELLS = env.int('GEO_MAX_COVER_CELLS', default=16)
+GEO_DEFAULT_RADIUS_KM = env.float('GEO_DEFAULT_RADIUS_KM', default=10.0)
+GEO_MAX_RADIUS_KM = env.float('GEO_MAX_RADIUS_KM', default=200.0)
+# seconds a listing's month availability bitmap stays cached (dropped on approve/cancel anyway)
+CALENDAR_CACHE_TIMEOUT = env.int('CALENDAR_CACHE_TIMEOUT', default=86400)
+# expire_bookings: days after their last day bookings move to BookingArchive, rows per batch
+BOOKING_ARCHIVE_AFTER_DAYS = env.int('BOOKING_ARCHIVE_AFTER_DAYS', default=180)
+BOOKING_EXPIRY_BATCH_SIZE = env.int('BOOKING_EXPIRY_BATCH_SIZE', default=1000)
+# seconds a /bookings/quote/ hold keeps other tenants' requests off its dates
+BOOKING_HOLD_TTL = env.int('BOOKING_HOLD_TTL', default=600)
+# max decisions per /bookings/bulk-decide/ request
+BULK_DECIDE_MAX_ITEMS = env.int('BULK_DECIDE_MAX_ITEMS', default=500)
+# listing bulk import/export: rows per insert batch, reported row errors, export fetch size
+BULK_IMPORT_BATCH_SIZE = env.int('BULK_IMPORT_BATCH_SIZE', default=1000)
+BULK_IMPORT_MAX_ERRORS = env.int('BULK_IMPORT_MAX_ERRORS', default=100)
+BULK_EXPORT_CHUNK_SIZE = env.int('BULK_EXPORT_CHUNK_SIZE', default=2000)
+# /listings/facets/: price bucket bounds (per day), number of cities listed
+LISTING_PRICE_BUCKETS = env.list('LISTING_PRICE_BUCKETS', cast=int, default=[50, 100, 200, 500])
+LISTING_FACET_CITY_LIMIT = env.int('LISTING_FACET_CITY_LIMIT', default=20)
+# upper bound for the ?page_size= query param (default size is REST_FRAMEWORK PAGE_SIZE)
+MAX_PAGE_SIZE = env.int('MAX_PAGE_SIZE', default=100)
 
 # Core settings
 DEFAULT_CHARSET = 'utf-8'
\ No newline at end of file